@@ -0,0 +1,79 @@
+from flask import flash
+from flask_admin import Admin
+from flask_admin.contrib.sqla import ModelView
+from sqlalchemy.orm.exc import StaleDataError
+from wtforms import DecimalField, HiddenField
+from wtforms.validators import ValidationError
+
+from app import db
+from app.models.category import Category
+from app.models.product import Product
+from app.models.user_order_summary import UserOrderSummary
+
+
+class VersionField(HiddenField):
+    """Carries the row version the form was rendered from; never written back to the model."""
+
+    def populate_obj(self, obj, name):
+        pass
+
+
+class ProductView(ModelView):
+    """
+    Product editor; prices are entered as decimal amounts, not cents.
+
+    The form remembers the version it was rendered from, so saving over a
+    product that a checkout or another editor changed in the meantime is
+    refused instead of silently overwriting its stock.
+    """
+
+    form_overrides = {'price': DecimalField}
+    form_args = {'price': {'places': 2}}
+    form_excluded_columns = ('version',)
+    form_extra_fields = {'version': VersionField()}
+
+    def on_model_change(self, form, model, is_created):
+        if not is_created and form.version.data and int(form.version.data) != model.version:
+            raise ValidationError('This product was changed by someone else while you were editing it. Reload it and try again.')
+
+    def handle_view_exception(self, exc):
+        if isinstance(exc, StaleDataError):
+            # Changed between the check above and the commit
+            flash('This product was changed by someone else while you were editing it. Reload it and try again.', 'error')
+            return True
+        return super().handle_view_exception(exc)
+
+
+class CategoryView(ModelView):
+    """Category editor; paths are maintained by the model, not edited by hand."""
+
+    column_list = ('name', 'parent', 'path')
+    column_default_sort = 'path'
+    form_columns = ('name', 'parent')
+
+
+class OrderSummaryView(ModelView):
+    """Read-only report of per-user order totals, maintained by checkout."""
+
+    can_create = False
+    can_edit = False
+    can_delete = False
+    column_display_pk = True
+    column_default_sort = ('total_spent', True)
+
+
+def init_admin(app):
+    """
+    Mount the Flask-Admin panel on the app.
+
+    Args:
+        app (Flask): The application being configured.
+
+    Returns:
+        Admin: The admin instance.
+    """
+    admin = Admin(app, name='Admin Panel', template_mode='bootstrap3')
+    admin.add_view(ProductView(Product, db.session))  # Add Product model to admin
+    admin.add_view(CategoryView(Category, db.session))
+    admin.add_view(OrderSummaryView(UserOrderSummary, db.session, name='Order Summaries'))
+    return admin
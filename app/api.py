@@ -0,0 +1,302 @@
+import hashlib
+import json
+
+from flask import Blueprint, current_app, request, stream_with_context
+from sqlalchemy import select
+
+from app import db
+from app.models.product import Product
+from app.services.catalog import (
+    SORT_COLUMNS,
+    catalog_cache,
+    catalog_version,
+    decode_cursor,
+    encode_cursor,
+    get_category,
+    get_product,
+    get_subtree_ids,
+    product_page_query,
+)
+from app.services.product_sync import iter_products
+from app.services.replicas import replica_reads, use_replica
+from app.services.search import search_products
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library encoder is used instead
+    orjson = None
+
+
+# Read-only JSON catalog API
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# Columns a client may ask for with ``fields``
+PRODUCT_FIELDS = {
+    'id': Product.id,
+    'name': Product.name,
+    'description': Product.description,
+    'price': Product.price,
+    'stock': Product.stock,
+    'sku': Product.sku,
+    'category_id': Product.category_id,
+    'version': Product.version,
+}
+DEFAULT_FIELDS = ['id', 'name', 'price', 'stock']
+CACHED_FIELDS = {'id', 'name', 'description', 'price', 'stock', 'version'}  # The keys of ``get_product``'s dicts
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_BATCH_IDS = 100
+EXPORT_CHUNK_SIZE = 1000
+
+
+class ApiError(Exception):
+    """
+    Raised by API views to answer with a JSON error.
+
+    Attributes:
+        status (int): The HTTP status code.
+        payload (dict): The response body.
+    """
+
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = {'error': message, **extra}
+
+
+def dumps(payload):
+    """
+    Serialize a payload to compact JSON bytes, with orjson when installed.
+
+    Args:
+        payload: Any JSON-compatible value.
+
+    Returns:
+        bytes: The encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def _json(payload, status=200):
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+
+@api.errorhandler(ApiError)
+def _handle_api_error(error):
+    return _json(error.payload, error.status)
+
+
+def _requested_fields():
+    value = request.args.get('fields')
+    if not value:
+        return DEFAULT_FIELDS
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in PRODUCT_FIELDS]
+    if unknown or not fields:
+        raise ApiError(f'Unknown fields: {", ".join(unknown)}', allowed=sorted(PRODUCT_FIELDS))
+    return fields
+
+
+def _limit():
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'limit must be between 1 and {MAX_LIMIT}')
+    return limit
+
+
+def _columns(fields, *required):
+    # The requested columns plus any the view needs itself (the ID, the sort key), once each
+    names = list(dict.fromkeys([*required, *fields]))
+    return [PRODUCT_FIELDS[name] for name in names]
+
+
+def _exact_prices(data):
+    # Prices are exact decimal strings, as in the catalog cache
+    if data.get('price') is not None:
+        data['price'] = str(data['price'])
+    return data
+
+
+def _serialize(product, fields):
+    return _exact_prices({field: getattr(product, field) for field in fields})
+
+
+def _fields_digest(fields):
+    # ETags cover the projection as well as the rows: each field list is its own representation
+    return hashlib.sha1(','.join(fields).encode()).hexdigest()[:8]
+
+
+def _conditional(response, etag):
+    # Clients revalidate every time; a matching ETag answers 304 without a body
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@api.route('/products')
+@use_replica
+def list_products():
+    """
+    List products one page at a time, by keyset.
+
+    Query arguments:
+        fields: Comma-separated columns to return (default id,name,price,stock).
+        sort: 'id' (default), 'name' or 'price'.
+        category: Only products in this category and its subcategories.
+        limit: Products per page, up to ``MAX_LIMIT``.
+        cursor: ``next_cursor`` from the previous page.
+
+    Returns:
+        JSON with ``data`` (the products) and ``next_cursor`` (None on the last page),
+        tagged with the listing generation.
+    """
+    fields = _requested_fields()
+    limit = _limit()
+    sort_by = request.args.get('sort', 'id')
+    if sort_by != 'id' and sort_by not in SORT_COLUMNS:
+        raise ApiError("sort must be 'id', 'name' or 'price'")
+    cursor = request.args.get('cursor')
+    if cursor and decode_cursor(cursor, sort_by) is None:
+        raise ApiError('Invalid cursor')
+
+    category_ids = None
+    category_id = request.args.get('category', type=int)
+    if category_id is not None:
+        category = get_category(category_id)
+        if category is None:
+            raise ApiError('Category not found', 404)
+        category_ids = get_subtree_ids(category)
+
+    # Pages are cached per field set and retired with the listing generation
+    cache = catalog_cache()
+    generation, _ = catalog_version()
+    key = f'catalog:api:products:{generation}:{",".join(fields)}:{sort_by}:{category_id}:{limit}:{cursor or ""}'
+    etag = f'{hashlib.sha1(key.encode()).hexdigest()[:16]}-{generation}'
+    if request.if_none_match.contains(etag):
+        return _conditional(current_app.response_class(status=304), etag)
+    payload = cache.get(key)
+    if payload is None:
+        sort_column = SORT_COLUMNS.get(sort_by)
+        required = ['id', sort_column.key] if sort_column is not None else ['id']
+        rows = product_page_query(sort_by, 1, cursor, limit, category_ids).with_entities(*_columns(fields, *required)).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, sort_column.key) if sort_column is not None else last.id, last.id)
+        payload = {'data': [_serialize(row, fields) for row in rows], 'next_cursor': next_cursor}
+        cache.set(key, payload)
+    return _conditional(_json(payload), etag)
+
+
+@api.route('/products/<int:product_id>')
+@use_replica
+def product_detail(product_id):
+    """
+    Return one product.
+
+    Fields held in the catalog cache are served from it; asking for others
+    reads just those columns. The ETag combines the field list with the
+    product's row version, so it changes with every edit, stock movement or
+    import.
+    """
+    fields = _requested_fields()
+    if set(fields) <= CACHED_FIELDS:
+        product = get_product(product_id)
+    else:
+        row = db.session.execute(select(*_columns(fields, 'version')).where(Product.id == product_id)).first()
+        product = {**_serialize(row, fields), 'version': row.version} if row is not None else None
+    if product is None:
+        raise ApiError('Product not found', 404)
+    return _conditional(_json({'data': {field: product[field] for field in fields}}), f'{product_id}-{product["version"]}-{_fields_digest(fields)}')
+
+
+@api.route('/products/batch')
+@use_replica
+def batch_products():
+    """
+    Return several products by ID with one query.
+
+    Query arguments:
+        ids: Comma-separated product IDs, up to ``MAX_BATCH_IDS``.
+        fields: Comma-separated columns to return.
+
+    Returns:
+        JSON with ``data`` in the order the IDs were given and ``missing``, the IDs not found.
+        The ETag is a digest of the fields and the found products' versions.
+    """
+    fields = _requested_fields()
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.args.get('ids', '').split(',') if value.strip()))
+    except ValueError:
+        raise ApiError('ids must be comma-separated integers')
+    if not ids:
+        raise ApiError('ids is required')
+    if len(ids) > MAX_BATCH_IDS:
+        raise ApiError(f'At most {MAX_BATCH_IDS} ids are allowed per request')
+
+    rows = db.session.execute(select(*_columns(fields, 'id', 'version')).where(Product.id.in_(ids))).all()
+    found = {row.id: row for row in rows}
+    versions = ','.join([*fields, *(f'{product_id}:{found[product_id].version}' for product_id in ids if product_id in found)])
+    return _conditional(_json({
+        'data': [_serialize(found[product_id], fields) for product_id in ids if product_id in found],
+        'missing': [product_id for product_id in ids if product_id not in found],
+    }), hashlib.sha1(versions.encode()).hexdigest())
+
+
+@api.route('/products/search')
+@use_replica
+def search():
+    """
+    Search product names and descriptions.
+
+    Query arguments:
+        q: The search text.
+        fields: Comma-separated columns to return.
+        sort: 'name' or 'price'; by default results are ranked by relevance.
+        page: The 1-based page number.
+        limit: Results per page, up to ``MAX_LIMIT``.
+
+    Returns:
+        JSON with ``data``, ``page``, ``per_page``, ``total`` and ``pages``.
+    """
+    fields = _requested_fields()
+    limit = _limit()
+    sort = request.args.get('sort')
+    if sort is not None and sort not in SORT_COLUMNS:
+        raise ApiError("sort must be 'name' or 'price'")
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    results = search_products(request.args.get('q', ''), page=page, per_page=limit, sort=sort, columns=_columns(fields, 'id'))
+    return _json({
+        'data': [_serialize(product, fields) for product in results.items],
+        'page': results.page,
+        'per_page': results.per_page,
+        'total': results.total,
+        'pages': results.pages,
+    })
+
+
+@api.route('/products/export')
+@use_replica
+def export_products():
+    """
+    Stream every product as JSON Lines, one object per line, in ID order.
+
+    Rows are read by keyset in chunks and written as they arrive, so the
+    whole catalog is never held in memory. Takes ``fields`` like the other
+    endpoints. Like them it reads from a replica when there is one.
+    """
+    fields = _requested_fields()
+
+    def generate():
+        # The rows are read after the view has returned, outside ``use_replica``
+        with replica_reads():
+            for product in iter_products(EXPORT_CHUNK_SIZE, fields):
+                yield dumps(_exact_prices(product)) + b'\n'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
@@ -0,0 +1,239 @@
+import asyncio
+import json
+from urllib.parse import parse_qsl
+
+from flask_login import current_user
+from werkzeug.datastructures import MultiDict
+
+from app import create_app
+from app.services.async_db import init_async_db
+
+
+DEFAULT_SYNC_THREADS = 16  # Threads running the mounted Flask app per process
+
+
+class AsyncRequest:
+    """
+    The parts of an HTTP request the async views need.
+
+    Attributes:
+        method (str): The HTTP method.
+        path (str): The request path.
+        args (MultiDict): The query string arguments.
+        headers (dict): Header values by lowercase name.
+        body (bytes): The request body.
+        user_id (int): The logged-in user's ID, or None.
+    """
+
+    def __init__(self, scope, body=b'', user_id=None):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.body = body
+        self.user_id = user_id
+
+    def get_json(self):
+        """Return the decoded JSON body, or None if it is not valid JSON."""
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+
+class AsyncRoute:
+    """
+    An async view registered on an ``AsyncRouter``.
+
+    Attributes:
+        view (callable): Coroutine function taking the app, its
+            ``AsyncDatabase`` and an ``AsyncRequest``, returning
+            ``(payload, status)``.
+        login_required (bool): Whether anonymous requests are refused.
+        fallback (bool): Whether anonymous requests go to the Flask view at
+            the same path instead, which handles remember-me cookies and
+            login redirects.
+    """
+
+    def __init__(self, view, login_required=False, fallback=False):
+        self.view = view
+        self.login_required = login_required
+        self.fallback = fallback
+
+
+class AsyncRouter:
+    """Maps ``(method, path)`` to async views, like a blueprint for ``AsgiApp``."""
+
+    def __init__(self):
+        self.routes = {}
+
+    def route(self, path, methods=('GET',), login_required=False, fallback=False):
+        """
+        Register an async view for a path.
+
+        Args:
+            path (str): The exact request path.
+            methods (tuple): The HTTP methods it answers.
+            login_required (bool): Refuse anonymous requests with a 401.
+            fallback (bool): Send anonymous requests to the Flask app instead.
+
+        Returns:
+            callable: A decorator registering the view.
+        """
+        def decorator(view):
+            for method in methods:
+                self.routes[(method, path)] = AsyncRoute(view, login_required, fallback)
+            return view
+        return decorator
+
+
+class ThreadedWsgiToAsgi:
+    """
+    Serves a WSGI app from ASGI, up to ``max_threads`` requests at a time.
+
+    asgiref's ``WsgiToAsgi`` runs the app in thread-sensitive mode, which
+    by default puts every request on one shared thread and would serialize
+    the whole Flask app. Each request here runs in its own
+    ``ThreadSensitiveContext``, which gives it a thread of its own.
+
+    Args:
+        wsgi_application (callable): The WSGI app.
+        max_threads (int): Requests handled by the WSGI app at once.
+    """
+
+    def __init__(self, wsgi_application, max_threads):
+        try:
+            from asgiref.sync import ThreadSensitiveContext
+            from asgiref.wsgi import WsgiToAsgi
+        except ImportError as exc:
+            raise RuntimeError('ASGI mode requires the asgiref package (pip install asgiref)') from exc
+
+        self.application = WsgiToAsgi(wsgi_application)
+        self._context_class = ThreadSensitiveContext
+        self._slots = asyncio.Semaphore(max_threads)
+
+    async def __call__(self, scope, receive, send):
+        async with self._slots, self._context_class():
+            await self.application(scope, receive, send)
+
+
+class AsgiApp:
+    """
+    ASGI entry point: async views for I/O-bound endpoints, with the Flask
+    app mounted for every other path.
+
+    Requests matching a route on ``router`` run as coroutines on the event
+    loop and query through the async engine, so one process can hold many
+    requests waiting on the database at once. Everything else is passed to
+    the Flask app on worker threads, unchanged.
+
+    Args:
+        flask_app (Flask): The configured Flask application.
+        database (AsyncDatabase): The async engine the views use.
+        router (AsyncRouter): The async views.
+        sync_threads (int): Threads running the Flask app.
+    """
+
+    def __init__(self, flask_app, database, router, sync_threads=DEFAULT_SYNC_THREADS):
+        self.flask_app = flask_app
+        self.database = database
+        self.router = router
+        self.wsgi = ThreadedWsgiToAsgi(flask_app, sync_threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            await send({'type': 'websocket.close'})
+            return
+
+        route = self.router.routes.get((scope['method'], scope['path']))
+        if route is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        user_id = await asyncio.to_thread(self._current_user_id, scope)
+        if route.login_required and user_id is None and route.fallback:
+            await self.wsgi(scope, receive, send)
+            return
+
+        # The app context gives the views the config and the models' query builders
+        with self.flask_app.app_context():
+            if route.login_required and user_id is None:
+                payload, status = {'error': 'Login required'}, 401
+            else:
+                body = await _read_body(receive)
+                payload, status = await route.view(self.flask_app, self.database, AsyncRequest(scope, body, user_id))
+            await _send_json(send, self.flask_app.json.dumps(payload), status)
+
+    def _current_user_id(self, scope):
+        # Resolve the user as the Flask app would, through Flask-Login and its
+        # user_loader, so revoked and stale session snapshots are refused here too.
+        # Runs on a worker thread: the session store and the loader may block.
+        with self.flask_app.request_context(_cookie_environ(scope)):
+            return current_user.id if current_user.is_authenticated else None
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.database.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _cookie_environ(scope):
+    cookie = b'; '.join(value for name, value in scope['headers'] if name.lower() == b'cookie')
+    return {
+        'REQUEST_METHOD': scope['method'],
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'HTTP_COOKIE': cookie.decode('latin-1'),
+    }
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _send_json(send, body, status):
+    body = body.encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def create_asgi_app(config=None):
+    """
+    Create the ASGI application.
+
+    The Flask app is created as usual and mounted for every path the async
+    views do not handle, so the sync deployment and this one serve the same
+    site. Needs asgiref, greenlet and an async database driver (aiomysql for
+    MySQL, aiosqlite for SQLite).
+
+    Args:
+        config (dict, optional): Settings passed on to ``create_app``.
+
+    Returns:
+        AsgiApp: The ASGI application.
+    """
+    from app.async_routes import routes
+
+    flask_app = create_app(config)
+    database = init_async_db(flask_app)
+    return AsgiApp(flask_app, database, routes, flask_app.config.get('ASGI_SYNC_THREADS', DEFAULT_SYNC_THREADS))
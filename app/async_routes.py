@@ -0,0 +1,178 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.asgi import AsyncRouter
+from app.models.product import Product
+from app.models.user_order_summary import UserOrderSummary
+from app.services.cart import add_to_cart_statement, cart_lines_query, cart_quantity_query, summarize_cart
+from app.services.catalog import MAX_PAGE, SORT_COLUMNS, product_to_dict
+from app.services.orders import ORDERS_PER_PAGE, order_lines_query, order_page_query
+from app.services.pagination import Page
+from app.services.search import (
+    SEARCH_PER_PAGE,
+    fulltext_queries,
+    search_index,
+    sort_key_queries,
+    sorted_page_ids,
+    tokenize,
+    use_fulltext,
+)
+
+
+# Async views served by ``app.asgi``; every other path goes to the Flask blueprint
+routes = AsyncRouter()
+
+_search_index_lock = asyncio.Lock()
+
+
+@routes.route('/cart/summary', login_required=True, fallback=True)
+async def cart_summary(app, database, request):
+    """
+    Return the current user's cart contents and totals as JSON.
+
+    Same response as the Flask view, from a single joined query.
+    """
+    rows = await database.all(cart_lines_query(request.user_id))
+    return summarize_cart(rows), 200
+
+
+@routes.route('/cart/add', methods=('POST',), login_required=True, fallback=True)
+async def add_to_cart(app, database, request):
+    """
+    Add a product to the current user's cart with a single upsert.
+
+    Same contract as the Flask view: ``{"product_id": 1, "quantity": 2}``.
+    """
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return {"error": "Request body must be a JSON object"}, 400
+    product_id = data.get('product_id')
+    quantity = data.get('quantity', 1)
+
+    if not isinstance(quantity, int) or quantity < 1:
+        return {"error": "Quantity must be a positive integer"}, 400
+
+    stmt = add_to_cart_statement(request.user_id, product_id, quantity, database.dialect)
+    async with database.session() as session, session.begin():
+        if database.dialect == 'mysql':
+            # MySQL has no RETURNING, so read the merged quantity back by key
+            result = await session.execute(stmt)
+            new_quantity = await session.scalar(cart_quantity_query(request.user_id, product_id)) if result.rowcount else None
+        else:
+            new_quantity = (await session.execute(stmt)).scalar()
+
+    if new_quantity is None:
+        return {"error": "Product not found"}, 404
+    return {"message": "Item added to cart", "cart_item": {"product_id": product_id, "quantity": new_quantity}}, 200
+
+
+@routes.route('/orders.json', login_required=True)
+async def order_history(app, database, request):
+    """
+    Return one page of the current user's orders, with their lines and the
+    user's lifetime totals, as JSON.
+
+    The optional ``before`` query argument is the order ID to continue from.
+    The page and the summary row are independent, so they are read
+    concurrently; the lines of the whole page then come from one query.
+    """
+    before_id = request.args.get('before', type=int)
+    page_query = order_page_query(request.user_id, before_id).limit(ORDERS_PER_PAGE + 1).statement
+    orders, summary = await asyncio.gather(
+        database.scalars(page_query),
+        database.scalar(select(UserOrderSummary).where(UserOrderSummary.user_id == request.user_id)),
+    )
+
+    # Fetch one extra row to find out whether another page follows
+    next_cursor = None
+    if len(orders) > ORDERS_PER_PAGE:
+        orders = orders[:ORDERS_PER_PAGE]
+        next_cursor = orders[-1].id
+
+    lines = {}
+    if orders:
+        for line in await database.all(order_lines_query([order.id for order in orders])):
+            lines.setdefault(line.order_id, []).append({
+                'product_id': line.product_id,
+                'product_name': line.name,
+                'quantity': line.quantity,
+                'unit_price': str(line.unit_price),
+                'line_total': str(line.line_total),
+            })
+
+    return {
+        'orders': [
+            {
+                'id': order.id,
+                'status': order.status,
+                'total_price': str(order.total_price),
+                'item_count': order.item_count,
+                'created_at': order.created_at.isoformat() if order.created_at else None,
+                'items': lines.get(order.id, []),
+            }
+            for order in orders
+        ],
+        'next_cursor': next_cursor,
+        'summary': {
+            'order_count': summary.order_count,
+            'item_count': summary.item_count,
+            'total_spent': str(summary.total_spent),
+            'last_order_at': summary.last_order_at.isoformat() if summary.last_order_at else None,
+        } if summary else None,
+    }, 200
+
+
+async def _ensure_search_index(database):
+    if search_index.loaded:
+        return
+    async with _search_index_lock:
+        if not search_index.loaded:
+            rows = await database.all(select(Product.id, Product.name, Product.description))
+            await asyncio.to_thread(search_index.load, rows)  # Building the index is CPU-bound
+
+
+@routes.route('/products/search.json')
+async def search_products(app, database, request):
+    """
+    Search product names and descriptions and return one page as JSON.
+
+    Takes ``query``, ``page`` and an optional ``sort`` ('name' or 'price').
+    On MySQL the FULLTEXT count and page queries run concurrently; other
+    databases rank with the in-process index and fetch the page by ID.
+    """
+    query = request.args.get('query', '')
+    page = min(max(request.args.get('page', 1, type=int), 1), MAX_PAGE)
+    sort = request.args.get('sort')
+    per_page = SEARCH_PER_PAGE
+    tokens = tokenize(query)
+
+    if not tokens:
+        results = Page([], page, per_page, 0)
+    elif use_fulltext():
+        count, items = fulltext_queries(tokens, page, per_page, sort)
+        total, products = await asyncio.gather(database.scalar(count), database.scalars(items))
+        results = Page(products, page, per_page, total)
+    else:
+        await _ensure_search_index(database)
+        ranked = search_index.search(tokens)
+        offset = (page - 1) * per_page
+        if sort in SORT_COLUMNS:
+            rows = []
+            for stmt in sort_key_queries([product_id for product_id, _ in ranked], sort):
+                rows.extend(await database.all(stmt))  # One chunk at a time, to hold a single pooled connection
+            page_ids = sorted_page_ids(rows, offset, per_page)
+        else:
+            page_ids = [product_id for product_id, _ in ranked[offset:offset + per_page]]
+        found = {product.id: product for product in await database.scalars(select(Product).where(Product.id.in_(page_ids)))} if page_ids else {}
+        products = [found[product_id] for product_id in page_ids if product_id in found]
+        results = Page(products, page, per_page, len(ranked))
+
+    return {
+        'query': query,
+        'products': [product_to_dict(product) for product in results.items],
+        'page': results.page,
+        'per_page': results.per_page,
+        'total': results.total,
+        'pages': results.pages,
+    }, 200
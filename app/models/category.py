@@ -0,0 +1,80 @@
+from sqlalchemy import event, func, literal, select, update
+from sqlalchemy.orm import attributes
+
+from app import db
+
+
+class Category(db.Model):
+    """
+    Model representing a product category in a tree of categories.
+
+    Each category stores its materialized path, the IDs from the root down
+    to itself (e.g. '/1/4/'), so a whole subtree is found with one indexed
+    prefix match instead of walking the tree.
+
+    Attributes:
+        id (int): The primary key for each category.
+        name (str): The category's display name.
+        parent_id (int): The parent category, or None for a top-level one.
+        path (str): Materialized path, maintained automatically.
+    """
+
+    __tablename__ = 'categories'
+    __table_args__ = (
+        # Subtree lookups are prefix matches on the path
+        db.Index('ix_categories_path', 'path'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # Primary key
+    name = db.Column(db.String(100), nullable=False)  # Display name
+    parent_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)  # Parent, if any
+    path = db.Column(db.String(255), nullable=False, default='')  # e.g. '/1/4/', set after insert
+
+    parent = db.relationship('Category', remote_side=[id], backref='children')
+
+    @property
+    def depth(self):
+        """How many ancestors the category has."""
+        return self.path.count('/') - 2
+
+    def __repr__(self):
+        """
+        Returns a string representation of the Category instance.
+        """
+        return f'<Category {self.path} {self.name}>'
+
+
+def _parent_path(connection, parent_id):
+    if parent_id is None:
+        return '/'
+    categories = Category.__table__
+    return connection.execute(select(categories.c.path).where(categories.c.id == parent_id)).scalar_one()
+
+
+@event.listens_for(Category, 'after_insert')
+def _set_path(mapper, connection, target):
+    # The path includes the category's own ID, which only exists after the INSERT
+    path = f'{_parent_path(connection, target.parent_id)}{target.id}/'
+    categories = Category.__table__
+    connection.execute(update(categories).where(categories.c.id == target.id).values(path=path))
+    attributes.set_committed_value(target, 'path', path)
+
+
+@event.listens_for(Category, 'after_update')
+def _move_subtree(mapper, connection, target):
+    if not attributes.get_history(target, 'parent_id').has_changes():
+        return
+    old_path = target.path
+    parent_path = _parent_path(connection, target.parent_id)
+    if parent_path.startswith(old_path):
+        raise ValueError('A category cannot be moved under itself')
+    new_path = f'{parent_path}{target.id}/'
+
+    # Rewrite the prefix of every path in the subtree, including this one
+    categories = Category.__table__
+    connection.execute(
+        update(categories)
+        .where(categories.c.path.startswith(old_path))
+        .values(path=literal(new_path) + func.substr(categories.c.path, len(old_path) + 1))
+    )
+    attributes.set_committed_value(target, 'path', new_path)
@@ -1,5 +1,7 @@
 from app import db
 from app.models.orderproduct import OrderProduct
+from app.models.outbox_job import utcnow
+from app.models.types import Money
 
 
 
@@ -10,16 +12,26 @@ class Order(db.Model):
     Attributes:
         id (int): The primary key for each order.
         user_id (int): Foreign key linking to the User who placed the order.
-        total_price (float): Total cost of the order.
+        total_price (Decimal): Total cost of the order, stored in cents.
         status (str): Status of the order (e.g., 'pending', 'completed').
+        shipping_address (str): Where the order is shipped.
+        item_count (int): Total units across the order's lines.
+        created_at (datetime): When the order was placed.
     """
 
     __tablename__ = 'orders'  # Sets the table name for the Order model
+    __table_args__ = (
+        # Order history lists a user's orders newest first by keyset on id
+        db.Index('ix_orders_user_id_id', 'user_id', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)  # Primary key
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Foreign key to User
-    total_price = db.Column(db.Float, nullable=False)  # Total price of the order
+    total_price = db.Column(Money, nullable=False)  # Total price of the order
     status = db.Column(db.String(20), default='pending')  # Order status
+    shipping_address = db.Column(db.Text, nullable=True)  # Address given at checkout
+    item_count = db.Column(db.Integer, nullable=False, default=0)  # Units ordered, summed at checkout
+    created_at = db.Column(db.DateTime, nullable=True, default=utcnow)  # Placement time; unknown for early orders
 
     # Relationship to link orders with products via OrderProduct
     products = db.relationship('OrderProduct', backref='order', lazy=True)
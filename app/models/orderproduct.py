@@ -1,4 +1,5 @@
 from app import db
+from app.models.types import Money
 
 
 class OrderProduct(db.Model):
@@ -11,14 +12,23 @@ class OrderProduct(db.Model):
         order_id (int): Foreign key linking to the Order.
         product_id (int): Foreign key linking to the Product.
         quantity (int): The quantity of the product in the associated order.
+        unit_price (Decimal): The product's price when the order was placed.
+        line_total (Decimal): ``unit_price`` times ``quantity``.
     """
 
     __tablename__ = 'order_products'  # Sets the table name for the OrderProduct model
+    __table_args__ = (
+        # Order pages load lines by order; product deletes and reports look them up by product
+        db.Index('ix_order_products_order_id_product_id', 'order_id', 'product_id'),
+        db.Index('ix_order_products_product_id', 'product_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)  # Primary key
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)  # Foreign key to Order
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)  # Foreign key to Product
     quantity = db.Column(db.Integer, nullable=False)  # Quantity of product in the order
+    unit_price = db.Column(Money, nullable=False)  # Price snapshot at purchase time
+    line_total = db.Column(Money, nullable=False)  # unit_price * quantity
 
     def __repr__(self):
         """
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+from app import db
+
+
+def utcnow():
+    """Return the current UTC time as a naive datetime, as stored in the database."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class OutboxJob(db.Model):
+    """
+    Model representing a unit of background work in the transactional outbox.
+
+    Jobs are written in the same transaction as the change that caused them
+    (for example an order), so they exist if and only if that change committed.
+
+    Attributes:
+        id (int): The primary key for each job.
+        kind (str): Name of the handler that runs the job.
+        payload (dict): JSON arguments passed to the handler.
+        status (str): 'pending', 'running', 'done' or 'failed'.
+        attempts (int): How many times the job has been claimed.
+        run_after (datetime): The job is not claimed before this time.
+        locked_at (datetime): When a worker last claimed the job.
+        last_error (str): The error from the most recent failed attempt.
+        created_at (datetime): When the job was enqueued.
+    """
+
+    __tablename__ = 'outbox_jobs'
+    __table_args__ = (
+        # Workers poll for due jobs by status and time
+        db.Index('ix_outbox_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # Primary key
+    kind = db.Column(db.String(50), nullable=False)  # Handler name
+    payload = db.Column(db.JSON, nullable=False, default=dict)  # Handler arguments
+    status = db.Column(db.String(20), nullable=False, default='pending')  # Job state
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # Claims so far
+    run_after = db.Column(db.DateTime, nullable=False, default=utcnow)  # Earliest run time
+    locked_at = db.Column(db.DateTime, nullable=True)  # Time of the current claim
+    last_error = db.Column(db.Text, nullable=True)  # Most recent failure
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow)  # Enqueue time
+
+    def __repr__(self):
+        """
+        Returns a string representation of the OutboxJob instance.
+        """
+        return f'<OutboxJob {self.id} {self.kind} {self.status}>'
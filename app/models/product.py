@@ -1,4 +1,6 @@
 from app import db
+from app.models.types import Money
+from app.models.category import Category  # Products reference the categories table
 from app.models.orderproduct import OrderProduct  # Ensure OrderProduct model is correctly defined
 
 class Product(db.Model):
@@ -9,21 +11,44 @@ class Product(db.Model):
         id (int): The primary key for each product.
         name (str): The name of the product.
         description (str): A text field for product details.
-        price (float): The price of the product.
+        price (Decimal): The price of the product, stored in cents.
         stock (int): Quantity available in stock.
+        sku (str): The stock keeping unit used by catalog imports, if any.
+        category_id (int): The category the product is listed under, if any.
+        version (int): Optimistic concurrency counter, bumped by every write.
     """
 
     # Table name for the Product model
     __tablename__ = 'products'
+    __table_args__ = (
+        # FULLTEXT index backing product search; only MySQL supports it
+        db.Index('ix_products_fulltext', 'name', 'description', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+        # Composite indexes matching the listing's keyset sorts
+        db.Index('ix_products_name_id', 'name', 'id'),
+        db.Index('ix_products_price_id', 'price', 'id'),
+        # Category pages filter on the category and list by name
+        db.Index('ix_products_category_name_id', 'category_id', 'name', 'id'),
+        # Imports match existing rows on their SKU
+        db.UniqueConstraint('sku', name='uq_products_sku'),
+    )
 
     # Column definitions
     id = db.Column(db.Integer, primary_key=True)  # Primary key
     name = db.Column(db.String(100), nullable=False)  # Product name, required
     description = db.Column(db.Text, nullable=True)  # Optional product description
-    price = db.Column(db.Float, nullable=False)  # Product price, required
+    price = db.Column(Money, nullable=False)  # Product price, required
     stock = db.Column(db.Integer, nullable=False, default=0)  # Quantity in stock
+    sku = db.Column(db.String(64), nullable=True)  # Stock keeping unit from the ERP, optional
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)  # Listing category
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped on every write
+
+    # ORM updates only apply if the row still has the version they read, so
+    # concurrent edits fail with StaleDataError instead of overwriting each other.
+    # Bulk UPDATEs and upserts must bump the version themselves.
+    __mapper_args__ = {'version_id_col': version}
 
     # Relationships
+    category = db.relationship('Category')
     orders = db.relationship('OrderProduct', backref='product', lazy=True)  # Ensure OrderProduct is defined properly
     cart_items = db.relationship('ShoppingCart', back_populates='product', cascade="all, delete-orphan")  # Ensure ShoppingCart is defined properly
 
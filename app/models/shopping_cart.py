@@ -9,14 +9,25 @@ class ShoppingCart(db.Model):
         user_id (int): Foreign key linking to the user.
         product_id (int): Foreign key linking to the product.
         quantity (int): The quantity of the product in the cart.
+        version (int): Optimistic concurrency counter, bumped by every write.
     """
 
     __tablename__ = 'shopping_carts'
+    __table_args__ = (
+        # One row per product per cart; add-to-cart upserts against this key
+        db.UniqueConstraint('user_id', 'product_id', name='uq_shopping_carts_user_product'),
+        # Deleting a product finds its cart rows; the unique key only helps lookups by user
+        db.Index('ix_shopping_carts_product_id', 'product_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped on every write
+
+    # Checked by ORM updates and deletes; bulk statements bump it themselves
+    __mapper_args__ = {'version_id_col': version}
 
     # Define relationships with User and Product
     user = db.relationship('User', back_populates='cart_items')  # Ensure User model has back_populates='cart_items'
@@ -0,0 +1,88 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from sqlalchemy import BigInteger, Integer
+from sqlalchemy.sql import operators
+from sqlalchemy.types import TypeDecorator
+
+
+CENT = Decimal('0.01')
+MAX_AMOUNT = Decimal(2 ** 63 - 1).scaleb(-2)  # The most a BIGINT of cents can hold
+
+# Scaling by a plain number keeps the money type, but the number itself is not money
+_SCALING_OPERATORS = {operators.mul, operators.truediv, operators.floordiv, operators.mod}
+
+
+def to_decimal(amount):
+    """
+    Round an amount to whole cents as an exact ``Decimal``.
+
+    Floats go through their shortest repr, so 0.1 becomes Decimal('0.10')
+    rather than its binary expansion.
+
+    Args:
+        amount (Decimal, int, float or str): The amount in currency units.
+
+    Returns:
+        Decimal: The amount with two decimal places.
+
+    Raises:
+        InvalidOperation: If the amount is not a number, is NaN or infinite,
+            or does not fit in a BIGINT of cents.
+    """
+    if isinstance(amount, float):
+        amount = repr(amount)
+    amount = Decimal(amount)
+    if not amount.is_finite():
+        raise InvalidOperation(f'{amount} is not a finite amount')
+    amount = amount.quantize(CENT, rounding=ROUND_HALF_UP)
+    if abs(amount) > MAX_AMOUNT:
+        raise InvalidOperation(f'{amount} is too large to store')
+    return amount
+
+
+def to_cents(amount):
+    """Convert an amount in currency units to integer minor units."""
+    return int(to_decimal(amount) * 100)
+
+
+def from_cents(cents):
+    """Convert integer minor units to an exact ``Decimal`` amount."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class Money(TypeDecorator):
+    """
+    Monetary amount stored as a BIGINT number of cents.
+
+    Python sees exact ``Decimal`` values with two places; the database
+    sees integers, so sums and products computed in SQL are exact and
+    index like any integer column. Adding money, or multiplying or
+    dividing by a plain number (``price * quantity``), keeps the money type
+    in SQL expressions.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return from_cents(value)
+
+    def coerce_compared_value(self, op, value):
+        if op in _SCALING_OPERATORS:
+            return Integer()
+        return self
+
+    class comparator_factory(BigInteger.Comparator):
+        def _adapt_expression(self, op, other_comparator):
+            if op in _SCALING_OPERATORS:
+                return op, self.type  # Money times a quantity is still money
+            if op in (operators.add, operators.sub) and isinstance(other_comparator.type, Money):
+                return op, self.type
+            return super()._adapt_expression(op, other_comparator)
@@ -0,0 +1,34 @@
+from app import db
+from app.models.types import Money
+
+
+class UserOrderSummary(db.Model):
+    """
+    Model holding a user's order aggregates, kept up to date by checkout.
+
+    One row per user who has ordered, so account pages and reports read a
+    single row instead of scanning the order history.
+
+    Attributes:
+        user_id (int): The user the summary belongs to; also the primary key.
+        order_count (int): Number of orders placed.
+        item_count (int): Units ordered across all orders.
+        total_spent (Decimal): Sum of the orders' total prices.
+        last_order_id (int): The user's most recent order.
+        last_order_at (datetime): When the most recent order was placed.
+    """
+
+    __tablename__ = 'user_order_summaries'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)  # One row per user
+    order_count = db.Column(db.Integer, nullable=False, default=0)  # Orders placed
+    item_count = db.Column(db.Integer, nullable=False, default=0)  # Units ordered
+    total_spent = db.Column(Money, nullable=False, default=0)  # Lifetime spend
+    last_order_id = db.Column(db.Integer, nullable=True)  # Most recent order
+    last_order_at = db.Column(db.DateTime, nullable=True)  # Time of the most recent order
+
+    def __repr__(self):
+        """
+        Returns a string representation of the UserOrderSummary instance.
+        """
+        return f'<UserOrderSummary User {self.user_id} - {self.order_count} orders>'
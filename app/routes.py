@@ -1,13 +1,35 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.forms import RegistrationForm, LoginForm, AddToCartForm
 from app.models.user import User
 from app.models.product import Product
-from app.models.order import Order
-from app.models.orderproduct import OrderProduct
 from app.models.shopping_cart import ShoppingCart
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.services.cart import (
+    CartOperationError,
+    UnknownProductsError,
+    add_to_cart as add_product_to_cart,
+    apply_cart_operations,
+    get_cart_summary,
+    remove_from_cart as remove_product_from_cart,
+    set_cart_quantity,
+)
+from app.services.catalog import (
+    get_category,
+    get_featured_products,
+    get_product,
+    get_product_page,
+    get_subcategories,
+    product_version,
+)
+from app.services.checkout import EmptyCartError, OutOfStockError, place_order
+from app.services.identity import forget_identity, remember_identity
+from app.services.orders import get_order_page, get_order_summary
+from app.services.page_cache import cached_page
+from app.services.passwords import HashingBusyError, login_throttle, password_hasher
+from app.services.replicas import use_replica
+from app.services.search import search_products as search_products_index
+from app.services.sql import VersionConflictError
 
 
 # Define a Blueprint
@@ -16,10 +38,12 @@ main = Blueprint('main', __name__)
 
 # Home route
 @main.route('/')
+@cached_page
+@use_replica
 def home():
     """Home route for the application."""
-    # Fetch all products without filtering by 'is_featured'
-    products = Product.query.limit(5).all()  # Adjust limit as needed
+    # Featured products come from the catalog cache
+    products = get_featured_products()
     return render_template('home.html', products=products)
 
 
@@ -53,8 +77,12 @@ def register():
         if existing_user:
             flash('Username or email already exists. Please choose another.', 'danger')
             return redirect(url_for('main.register'))  # Redirect back to registration
-        # Hash the password before saving to the database
-        hashed_password = generate_password_hash(form.password.data)
+        # Hash the password before saving to the database, off the request thread
+        try:
+            hashed_password = password_hasher().hash(form.password.data)
+        except HashingBusyError:
+            flash('We are very busy right now. Please try again in a moment.', 'danger')
+            return render_template('register.html', form=form), 503
         # Create a new user instance
         user = User(username=form.username.data, email=form.email.data, password=hashed_password)  # Make sure to hash the password
         db.session.add(user)  # Add user to the database session
@@ -76,12 +104,34 @@ def login():
     """
     form = LoginForm()
     if form.validate_on_submit():
+        # Turn away clients with too many recent failures before doing any hashing
+        throttle = login_throttle()
+        if throttle.is_blocked(request.remote_addr, form.email.data):
+            flash('Too many failed login attempts. Please try again later.', 'danger')
+            return render_template('login.html', form=form), 429
+
+        hasher = password_hasher()
         user = User.query.filter_by(email=form.email.data).first()  # Find user by email
-        if user and check_password_hash(user.password, form.password.data):  # Check if user exists and password matches
+        try:
+            valid = user is not None and hasher.verify(user.password, form.password.data)  # Check if user exists and password matches
+        except HashingBusyError:
+            flash('We are very busy right now. Please try again in a moment.', 'danger')
+            return render_template('login.html', form=form), 503
+        if valid:
+            throttle.reset(form.email.data)
+            # Upgrade hashes made with older cost settings while the plain password is at hand
+            if hasher.needs_rehash(user.password):
+                try:
+                    user.password = hasher.hash(form.password.data)
+                    db.session.commit()
+                except HashingBusyError:
+                    pass  # Try again on a later login
             login_user(user)  # Log in the user
+            remember_identity(user)  # Cache the user in the session for later requests
             flash('Login successful!', 'success')  # Show success message
             return redirect(url_for('main.home'))  # Redirect to the home page after login
         else:
+            throttle.record_failure(request.remote_addr, form.email.data)
             flash('Login unsuccessful. Please check your email and password', 'danger')  # Show error message
     return render_template('login.html', form=form)  # Render the login template with the form
 
@@ -97,41 +147,38 @@ def logout():
         Redirect to home page after logout.
     """
     logout_user()  # Log out the user
+    forget_identity()  # Drop the cached user from the session
     flash('You have been logged out.', 'success')  # Show logout success message
     return redirect(url_for('main.home'))  # Redirect to the home page
 
 
 # Products route - list all products
 @main.route('/products')
+@cached_page
+@use_replica
 def product_list():
     sort_by = request.args.get('sort', 'name')
     search_query = request.args.get('search', '')
     page = request.args.get('page', 1, type=int)
 
-    # Filtering products based on search query
-    products_query = Product.query
+    # Searches are relevance-ranked unless a sort order was asked for explicitly
     if search_query:
-        products_query = products_query.filter(Product.name.ilike(f'%{search_query}%'))
+        sort = sort_by if 'sort' in request.args else None
+        products = search_products_index(search_query, page=page, sort=sort)
+        return render_template('product_list.html', products=products, sort_by=sort_by, search_query=search_query,
+                               categories=get_subcategories())
 
-    # Sorting products
-    if sort_by == 'name':
-        products_query = products_query.order_by(Product.name.asc())
-    elif sort_by == 'price':
-        products_query = products_query.order_by(Product.price.asc())
-    else:
-        products_query = products_query
-
-    # Paginate results
-    products = products_query.paginate(page=page, per_page=10)
-    return render_template('product_list.html', products=products, sort_by=sort_by, search_query=search_query)
+    # Keyset cursor from a previous page's "Next" link; plain page numbers still work
+    cursor = request.args.get('cursor')
+    products = get_product_page(sort_by, page=page, cursor=cursor)
+    return render_template('product_list.html', products=products, sort_by=sort_by, search_query=search_query,
+                           categories=get_subcategories())
 
 
 # Product detail route - view details of a specific product
-from flask import render_template, request
-from .forms import AddToCartForm  # Adjust this import based on your structure
-from app.models.product import Product  # Import your Product model
-
 @main.route('/product/<int:product_id>', methods=['GET', 'POST'])
+@cached_page(version=product_version)
+@use_replica
 def product_detail(product_id):
     """
     Render the product detail page for a specific product and handle
@@ -151,8 +198,11 @@ def product_detail(product_id):
     submission to add the specified quantity of the product to the cart.
     """
     
-    product = Product.query.get_or_404(product_id)  # Fetch the product or return a 404 if not found
-    form = AddToCartForm()  # Create an instance of your form
+    product = get_product(product_id)  # Fetch the product through the catalog cache
+    if product is None:
+        abort(404)
+    # Anonymous pages are shared through the page cache, so they must not carry a per-session CSRF token
+    form = AddToCartForm(meta={'csrf': current_user.is_authenticated})
     
     if form.validate_on_submit():
         # Handle the form submission, e.g., add the product to the cart
@@ -165,32 +215,56 @@ def product_detail(product_id):
 
 
 @main.route('/products/search', methods=['GET'])
+@use_replica
 def search_products():
     query = request.args.get('query', '')
-    products = Product.query.filter(Product.name.ilike(f"%{query}%")).all()
-    return render_template('product_list.html', products=products, query=query)
+    page = request.args.get('page', 1, type=int)
+    products = search_products_index(query, page=page)
+    return render_template('product_list.html', products=products, query=query, search_query=query)
 
 @main.route('/products/category/<int:category_id>')
+@cached_page
+@use_replica
 def products_by_category(category_id):
-    products = Product.query.filter_by(category_id=category_id).all()
-    return render_template('product_list.html', products=products)
+    """
+    List the products in a category and its subcategories, one page at a time.
+
+    Product counts come from the cached category tree rather than being
+    counted per request.
+    """
+    category = get_category(category_id)
+    if category is None:
+        abort(404)
+    sort_by = request.args.get('sort', 'name')
+    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
+    products = get_product_page(sort_by, page=page, cursor=cursor, category=category)
+    return render_template('product_list.html', products=products, sort_by=sort_by, search_query='',
+                           current_category=category, categories=get_subcategories(category_id))
 
 
 # Orders route
 @main.route('/orders')
 @login_required
+@use_replica
 def manage_orders():
     """
-    Route to display orders for the currently logged-in user.
+    Route to display orders for the currently logged-in user, one page at a time.
+    The optional ``before`` query argument is the order ID to continue from.
 
     Returns:
         Rendered orders template with user-specific order data.
     """
-    # Fetch orders for the logged-in user, including related products
-    user_orders = Order.query.filter_by(user_id=current_user.id).all()
+    before_id = request.args.get('before', type=int)
+
+    # Fetch one page of orders for the logged-in user, including related products
+    user_orders, next_cursor = get_order_page(current_user.id, before_id=before_id)
+
+    # Lifetime totals come from the user's summary row, not the order history
+    summary = get_order_summary(current_user.id)
 
     # Render the orders template, passing in the user's orders
-    return render_template('orders.html', orders=user_orders)
+    return render_template('orders.html', orders=user_orders, next_cursor=next_cursor, summary=summary)
 
 
 # Shopping Cart Routes
@@ -208,19 +282,43 @@ def add_to_cart():
     product_id = data.get('product_id')
     quantity = data.get('quantity', 1)
 
-    product = Product.query.get(product_id)
-    if not product:
+    if not isinstance(quantity, int) or quantity < 1:
+        return jsonify({"error": "Quantity must be a positive integer"}), 400
+
+    # Single upsert; returns None when the product does not exist
+    new_quantity = add_product_to_cart(current_user.id, product_id, quantity)
+    if new_quantity is None:
         return jsonify({"error": "Product not found"}), 404
 
-    cart_item = ShoppingCart.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-    if cart_item:
-        cart_item.quantity += quantity
-    else:
-        cart_item = ShoppingCart(user_id=current_user.id, product_id=product_id, quantity=quantity)
-        db.session.add(cart_item)
+    db.session.commit()
+    return jsonify({"message": "Item added to cart", "cart_item": {"product_id": product_id, "quantity": new_quantity}}), 200
+
+
+@main.route('/cart/batch', methods=['POST'])
+@login_required
+def batch_update_cart():
+    """
+    Route to apply a batch of cart operations in one transaction.
+
+    Expects a JSON body of the form ``{"operations": [{"op": "add", "product_id": 1, "quantity": 2}, ...]}``
+    where ``op`` is 'add', 'set' or 'remove'.
+
+    Returns:
+        JSON response with the updated cart summary, or an error if any operation is invalid.
+    """
+    data = request.get_json(silent=True) or {}
+
+    try:
+        summary = apply_cart_operations(current_user.id, data.get('operations'))
+    except CartOperationError as error:
+        db.session.rollback()
+        return jsonify({"error": str(error)}), 400
+    except UnknownProductsError as error:
+        db.session.rollback()
+        return jsonify({"error": "Product not found", "product_ids": error.product_ids}), 404
 
     db.session.commit()
-    return jsonify({"message": "Item added to cart", "cart_item": {"product_id": product_id, "quantity": cart_item.quantity}}), 200
+    return jsonify({"message": "Cart updated", "cart": summary}), 200
 
 
 @main.route('/cart/remove', methods=['DELETE'])
@@ -228,6 +326,8 @@ def add_to_cart():
 def remove_from_cart():
     """
     Route to remove an item from the shopping cart based on product ID.
+    An optional ``version`` (from the cart summary) refuses the removal with
+    a 409 if the item changed since the client read it.
 
     Returns:
         JSON response with success message if item is removed, error if item not found in cart.
@@ -235,12 +335,12 @@ def remove_from_cart():
     data = request.get_json()
     product_id = data.get('product_id')
 
-    cart_item = ShoppingCart.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-    if not cart_item:
+    try:
+        removed = remove_product_from_cart(current_user.id, product_id, expected_version=data.get('version'))
+    except VersionConflictError as error:
+        return jsonify({"error": str(error), "current_version": error.current_version}), 409
+    if not removed:
         return jsonify({"error": "Item not in cart"}), 404
-
-    db.session.delete(cart_item)
-    db.session.commit()
     return jsonify({"message": "Item removed from cart"}), 200
 
 
@@ -253,23 +353,20 @@ def view_cart():
     Returns:
         Rendered cart template with list of items in cart and total price.
     """
-    cart_items = ShoppingCart.query.filter_by(user_id=current_user.id).all()
-    cart_details = []
-    total_price = 0
-
-    for item in cart_items:
-        product = Product.query.get(item.product_id)
-        item_total = product.price * item.quantity
-        cart_details.append({
-            "product_id": item.product_id,
-            "product_name": product.name,
-            "price_per_unit": product.price,
-            "quantity": item.quantity,
-            "item_total": item_total
-        })
-        total_price += item_total
-
-    return render_template('cart.html', cart_items=cart_details, total_price=total_price)
+    summary = get_cart_summary(current_user.id)
+    return render_template('cart.html', cart_items=summary['items'], total_price=summary['total_price'])
+
+
+@main.route('/cart/summary', methods=['GET'])
+@login_required
+def cart_summary():
+    """
+    Route to return the current user's cart contents and totals as JSON.
+
+    Returns:
+        JSON response with the cart line items, total price and item count.
+    """
+    return jsonify(get_cart_summary(current_user.id)), 200
 
 @main.route('/add-to-cart', methods=['GET', 'POST'])
 @login_required
@@ -283,27 +380,23 @@ def add_to_cart_page():
         product_id = request.form.get('product_id')
         quantity = request.form.get('quantity', 1)
         
-        # Convert quantity to integer, and handle potential conversion error
+        # Convert IDs and quantity to integers, and handle potential conversion error
         try:
+            product_id = int(product_id)
             quantity = int(quantity)
-        except ValueError:
+        except (TypeError, ValueError):
+            flash("Invalid quantity. Please enter a number.", 'danger')
+            return redirect(url_for('main.add_to_cart_page'))
+
+        if quantity < 1:
             flash("Invalid quantity. Please enter a number.", 'danger')
             return redirect(url_for('main.add_to_cart_page'))
 
-        # Validate product ID
-        product = Product.query.get(product_id)
-        if not product:
+        # Add the item or increase its quantity in one upsert, which also validates the product ID
+        if add_product_to_cart(current_user.id, product_id, quantity) is None:
             flash('Product not found', 'danger')
             return redirect(url_for('main.add_to_cart_page'))
 
-        # Add or update item in the cart
-        cart_item = ShoppingCart.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-        if cart_item:
-            cart_item.quantity += quantity  # Update quantity if item exists
-        else:
-            cart_item = ShoppingCart(user_id=current_user.id, product_id=product_id, quantity=quantity)
-            db.session.add(cart_item)  # Add new item if not in cart
-        
         # Commit changes to the database
         db.session.commit()
         flash('Item added to cart!', 'success')
@@ -318,26 +411,48 @@ def update_cart(item_id):
     """
     Route to update the quantity of an item in the shopping cart.
 
+    Accepts the cart page's form or a JSON body ``{"quantity": 2, "version": 3}``.
+    ``version`` is the item's version when the client read it; if the item
+    has changed since, the update is refused rather than overwriting it.
+
     Parameters:
     item_id (int): The ID of the shopping cart item to update.
 
     Returns:
-    Redirect to the cart view with success or error message.
+    Redirect to the cart view with success or error message, or for JSON
+    requests the updated item (409 on a version conflict).
     """
-    quantity = request.form.get('quantity', type=int)
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        quantity = data.get('quantity')
+        version = data.get('version')
+        if not isinstance(quantity, int) or quantity < 1:
+            return jsonify({"error": "Quantity must be a positive integer"}), 400
+        try:
+            cart_item = set_cart_quantity(current_user.id, item_id, quantity, expected_version=version)
+        except VersionConflictError as error:
+            return jsonify({"error": str(error), "current_version": error.current_version}), 409
+        if cart_item is None:
+            return jsonify({"error": "Item not in cart"}), 404
+        return jsonify({"message": "Cart updated", "cart_item": {
+            "item_id": cart_item.id, "product_id": cart_item.product_id, "quantity": cart_item.quantity, "version": cart_item.version,
+        }}), 200
 
-    # Find the cart item by the item_id
-    cart_item = ShoppingCart.query.filter_by(user_id=current_user.id, id=item_id).first()
+    quantity = request.form.get('quantity', type=int)
+    version = request.form.get('version', type=int)  # Rendered with the cart, to catch edits from another tab
 
-    if cart_item:
-        if quantity is not None and quantity > 0:
-            cart_item.quantity = quantity  # Update the quantity
-            db.session.commit()
-            flash('Cart updated successfully!', 'success')
+    if quantity is not None and quantity > 0:
+        try:
+            cart_item = set_cart_quantity(current_user.id, item_id, quantity, expected_version=version)
+        except VersionConflictError:
+            flash('This item changed in another window. Please review your cart and try again.', 'danger')
         else:
-            flash('Invalid quantity. Please enter a valid number.', 'danger')
+            if cart_item:
+                flash('Cart updated successfully!', 'success')
+            else:
+                flash('Item not found in cart.', 'danger')
     else:
-        flash('Item not found in cart.', 'danger')
+        flash('Invalid quantity. Please enter a valid number.', 'danger')
 
     return redirect(url_for('main.view_cart'))  # Redirect back to the cart view
 
@@ -345,9 +460,35 @@ def update_cart(item_id):
 @main.route('/checkout', methods=['GET', 'POST'])
 @login_required
 def checkout():
+    """
+    Route to review the cart and place an order.
+    On a POST request, turns the cart into an order, reserving stock, in a single transaction.
+
+    Returns:
+        Redirect to the orders page once the order is placed, or the checkout page otherwise.
+    """
     if request.method == 'POST':
         # Get shipping details from the form
-        shipping_address = request.form.get('shipping_address')
-        # Redirect to payment if all information is provided
-        return redirect(url_for('main.payment'))
-    return render_template('checkout.html')
+        shipping_address = request.form.get('shipping_address', '').strip()
+        if not shipping_address:
+            flash('Please enter a shipping address.', 'danger')
+            return redirect(url_for('main.checkout'))
+
+        try:
+            order = place_order(current_user.id, shipping_address)
+        except EmptyCartError:
+            db.session.rollback()
+            flash('Your cart is empty.', 'danger')
+            return redirect(url_for('main.view_cart'))
+        except OutOfStockError:
+            db.session.rollback()
+            flash('Some items in your cart are no longer in stock. Please update your cart.', 'danger')
+            return redirect(url_for('main.view_cart'))
+
+        order_id = order.id  # Read before commit expires the instance
+        db.session.commit()
+        flash(f'Order #{order_id} has been placed!', 'success')
+        return redirect(url_for('main.manage_orders'))
+
+    summary = get_cart_summary(current_user.id)
+    return render_template('checkout.html', cart_items=summary['items'], total_price=summary['total_price'])
@@ -0,0 +1,6 @@
+"""
+Service layer shared by the route handlers.
+
+Each module groups the queries and write paths for one area of the shop so
+that the HTML views and the JSON endpoints go through the same code.
+"""
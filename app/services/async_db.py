@@ -0,0 +1,111 @@
+from sqlalchemy.engine import make_url
+
+
+# Async driver used for each database when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    'mysql': 'aiomysql',
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+
+def async_database_url(url):
+    """
+    Return the async-driver equivalent of a database URI.
+
+    ``mysql+pymysql://...`` becomes ``mysql+aiomysql://...``, and so on; the
+    host, credentials and options are kept.
+
+    Args:
+        url (str): The synchronous SQLAlchemy database URI.
+
+    Returns:
+        URL: The URI with an async driver.
+
+    Raises:
+        ValueError: If no async driver is known for the database.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver is known for {backend}; set ASYNC_DATABASE_URL')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+class AsyncDatabase:
+    """
+    The async engine used by the ASGI views.
+
+    ``all``, ``scalar`` and ``scalars`` each check out their own pooled
+    connection, so independent reads can run concurrently with
+    ``asyncio.gather``. Writes go through ``session()``.
+
+    Args:
+        url (str or URL): An async SQLAlchemy database URI.
+        options (dict): Keyword arguments for ``create_async_engine``.
+
+    Raises:
+        RuntimeError: If SQLAlchemy's asyncio support or the async driver is not installed.
+    """
+
+    def __init__(self, url, options=None):
+        url = make_url(url)
+        try:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+            self.engine = create_async_engine(url, **(options or {}))
+        except ImportError as exc:
+            raise RuntimeError(
+                f'ASGI mode requires greenlet and the {url.get_driver_name()} driver (pip install greenlet {url.get_driver_name()})'
+            ) from exc
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    @property
+    def dialect(self):
+        """The name of the database dialect, e.g. 'mysql'."""
+        return self.engine.dialect.name
+
+    def session(self):
+        """Return a new ``AsyncSession``; use it as an async context manager."""
+        return self.sessions()
+
+    async def all(self, stmt):
+        """Execute a statement and return all its rows."""
+        async with self.sessions() as session:
+            return (await session.execute(stmt)).all()
+
+    async def scalar(self, stmt):
+        """Execute a statement and return the first column of its first row."""
+        async with self.sessions() as session:
+            return await session.scalar(stmt)
+
+    async def scalars(self, stmt):
+        """Execute a statement and return the first column of every row."""
+        async with self.sessions() as session:
+            return (await session.scalars(stmt)).all()
+
+    async def dispose(self):
+        """Close every pooled connection."""
+        await self.engine.dispose()
+
+
+def init_async_db(app):
+    """
+    Create the async engine for the app's primary database.
+
+    ``ASYNC_DATABASE_URL`` selects the database; by default it is
+    ``SQLALCHEMY_DATABASE_URI`` with the matching async driver. The pool
+    settings in ``SQLALCHEMY_ENGINE_OPTIONS`` apply to it too.
+
+    Args:
+        app (Flask): The application being configured.
+
+    Returns:
+        AsyncDatabase: The database, also stored in ``app.extensions['async_db']``.
+    """
+    url = app.config.get('ASYNC_DATABASE_URL') or async_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    database = AsyncDatabase(url, app.config.get('SQLALCHEMY_ENGINE_OPTIONS'))
+    if 'metrics' in app.extensions:
+        from app.services.instrumentation import instrument_engine
+        instrument_engine(database.engine.sync_engine)
+    app.extensions['async_db'] = database
+    return database
@@ -0,0 +1,220 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class LocalCache:
+    """
+    In-process LRU cache with per-entry expiry.
+
+    Values are kept as-is, so callers should store plain data (dicts, lists,
+    numbers) rather than ORM instances tied to a session.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, default_ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def incr(self, key, ttl=None):
+        """Add one to a counter and return it; a new counter expires after ``ttl`` seconds, if given."""
+        with self._lock:
+            expires_at, value = self._entries.get(key, (None, None))
+            if expires_at is not None and expires_at <= time.monotonic():
+                expires_at, value = None, None
+            if value is None and ttl:
+                expires_at = time.monotonic() + ttl
+            value = (value or 0) + 1
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """
+    Cache stored in Redis, shared by every worker process.
+
+    Args:
+        client: A Redis client (``redis.Redis`` or anything with the same
+            ``get``/``set``/``delete``/``incr`` methods, such as ``FakeRedis``).
+        prefix (str): Namespace prepended to every key.
+        default_ttl (int): Expiry in seconds for entries set without a TTL.
+    """
+
+    def __init__(self, client, prefix='quickshop:', default_ttl=DEFAULT_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value, separators=(',', ':')), ex=ttl or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def incr(self, key, ttl=None):
+        """Add one to a counter and return it; a new counter expires after ``ttl`` seconds, if given."""
+        if not ttl:
+            return self.client.incr(self.prefix + key)
+        # Create the key with its expiry and count in one transaction, so no counter outlives its window
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, 0, ex=ttl, nx=True)
+        pipe.incr(self.prefix + key)
+        return pipe.execute()[1]
+
+    def clear(self):
+        # Only the keys under our prefix are removed
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class FakeRedis:
+    """
+    Minimal in-memory stand-in for ``redis.Redis``, for tests and local runs
+    without a Redis server. Implements only the commands the caches use.
+    """
+
+    def __init__(self):
+        self._data = {}  # key -> (expires_at, bytes value)
+        self._lock = threading.RLock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, name):
+        with self._lock:
+            entry = self._live(name)
+            return entry[1] if entry else None
+
+    def set(self, name, value, ex=None, nx=False):
+        if isinstance(value, (str, int)):
+            value = str(value).encode()
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self._data[name] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            entry = self._live(name)
+            expires_at, value = entry if entry else (None, b'0')
+            value = int(value) + amount
+            self._data[name] = (expires_at, str(value).encode())
+            return value
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def scan_iter(self, match=None):
+        prefix = match[:-1] if match and match.endswith('*') else match
+        with self._lock:
+            keys = [key for key in self._data if prefix is None or key.startswith(prefix)]
+        return iter(keys)
+
+
+class FakePipeline:
+    """Queues commands for ``FakeRedis`` and runs them atomically, like a MULTI/EXEC pipeline."""
+
+    def __init__(self, client):
+        self.client = client
+        self._commands = []
+
+    def set(self, *args, **kwargs):
+        self._commands.append((self.client.set, args, kwargs))
+        return self
+
+    def incr(self, *args, **kwargs):
+        self._commands.append((self.client.incr, args, kwargs))
+        return self
+
+    def execute(self):
+        with self.client._lock:
+            results = [command(*args, **kwargs) for command, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+def make_cache(backend='memory', url=None, max_entries=DEFAULT_MAX_ENTRIES, default_ttl=DEFAULT_TTL, prefix='quickshop:'):
+    """
+    Build a cache for the configured backend.
+
+    Args:
+        backend (str): 'memory' for an in-process LRU, 'redis' for a Redis
+            server at ``url``, or 'fakeredis' for an in-memory Redis stand-in.
+        url (str, optional): Redis connection URL for the 'redis' backend.
+        max_entries (int): LRU capacity of the 'memory' backend.
+        default_ttl (int): Default expiry in seconds.
+        prefix (str): Key namespace for the Redis backends.
+
+    Returns:
+        LocalCache or RedisCache: The configured cache.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+        RuntimeError: If the 'redis' backend is chosen but redis-py is not installed.
+    """
+    if backend == 'memory':
+        return LocalCache(max_entries=max_entries, default_ttl=default_ttl)
+    if backend == 'fakeredis':
+        return RedisCache(FakeRedis(), prefix=prefix, default_ttl=default_ttl)
+    if backend == 'redis':
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("The 'redis' cache backend requires the redis package (pip install redis)") from exc
+        return RedisCache(redis.Redis.from_url(url or 'redis://localhost:6379/0'), prefix=prefix, default_ttl=default_ttl)
+    raise ValueError(f'Unknown cache backend: {backend!r}')
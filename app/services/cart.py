@@ -0,0 +1,338 @@
+from decimal import Decimal
+
+from sqlalchemy import delete, literal, select
+
+from app import db
+from app.models.product import Product
+from app.models.shopping_cart import ShoppingCart
+from app.services.query_audit import query_shape
+from app.services.sql import VersionConflictError, commit_with_retry, dialect_name, upsert
+
+
+MAX_BATCH_OPERATIONS = 500
+
+
+class CartOperationError(Exception):
+    """Raised when a batch of cart operations is malformed."""
+
+
+class UnknownProductsError(Exception):
+    """
+    Raised when cart operations reference products that do not exist.
+
+    Attributes:
+        product_ids (list): The IDs that were not found.
+    """
+
+    def __init__(self, product_ids):
+        super().__init__(f'Unknown products: {product_ids}')
+        self.product_ids = product_ids
+
+
+def cart_lines_query(user_id):
+    """
+    Build the joined query for a user's cart lines with their line totals.
+
+    Args:
+        user_id (int): The ID of the user whose cart is read.
+
+    Returns:
+        Select: One row per cart line, in the order items were added.
+    """
+    item_total = (Product.price * ShoppingCart.quantity).label('item_total')
+    return (
+        select(
+            ShoppingCart.id,
+            ShoppingCart.product_id,
+            Product.name,
+            Product.price,
+            ShoppingCart.quantity,
+            ShoppingCart.version,
+            item_total,
+        )
+        .join(ShoppingCart.product)
+        .where(ShoppingCart.user_id == user_id)
+        .order_by(ShoppingCart.id)
+    )
+
+
+@query_shape('cart.summary')
+def _cart_summary_shape():
+    return cart_lines_query(1)
+
+
+def summarize_cart(rows):
+    """
+    Fold cart lines into the summary returned by ``get_cart_summary``.
+
+    Args:
+        rows (iterable): Rows from ``cart_lines_query``.
+
+    Returns:
+        dict: ``items`` (list of line dicts), ``total_price`` and ``item_count``.
+    """
+    items = []
+    total_price = Decimal('0.00')
+    item_count = 0
+    for row in rows:
+        items.append({
+            "item_id": row.id,
+            "product_id": row.product_id,
+            "product_name": row.name,
+            "price_per_unit": row.price,
+            "quantity": row.quantity,
+            "item_total": row.item_total,
+            "version": row.version,
+        })
+        total_price += row.item_total
+        item_count += row.quantity
+
+    return {"items": items, "total_price": total_price, "item_count": item_count}
+
+
+def get_cart_summary(user_id):
+    """
+    Build the cart summary for a user with a single joined query.
+
+    Line totals are computed by the database in integer cents; the exact
+    ``Decimal`` grand total and the item count are folded from the same
+    result set, so the whole summary costs one round trip regardless of how
+    many items are in the cart.
+
+    Args:
+        user_id (int): The ID of the user whose cart is summarised.
+
+    Returns:
+        dict: ``items`` (list of line dicts), ``total_price`` and ``item_count``.
+    """
+    return summarize_cart(db.session.execute(cart_lines_query(user_id)))
+
+
+def add_to_cart(user_id, product_id, quantity):
+    """
+    Add a quantity of a product to a user's cart in one statement.
+
+    The row is inserted, or its quantity incremented if the user already has
+    the product in the cart, by a single upsert on the
+    ``(user_id, product_id)`` unique key. The rows come from an
+    ``INSERT ... SELECT`` over ``products``, so a missing product inserts
+    nothing and needs no separate lookup. Concurrent adds cannot create
+    duplicates or lose increments. The caller commits.
+
+    Args:
+        user_id (int): The ID of the user whose cart is updated.
+        product_id (int): The ID of the product to add.
+        quantity (int): How many units to add.
+
+    Returns:
+        int: The product's new quantity in the cart, or None if the product
+        does not exist.
+    """
+    dialect = dialect_name(ShoppingCart)
+    stmt = add_to_cart_statement(user_id, product_id, quantity, dialect)
+    if dialect == 'mysql':
+        # MySQL has no RETURNING, so read the merged quantity back by key
+        if db.session.execute(stmt).rowcount == 0:
+            return None
+        return db.session.scalar(cart_quantity_query(user_id, product_id))
+    return db.session.execute(stmt).scalar()
+
+
+def add_to_cart_statement(user_id, product_id, quantity, dialect):
+    """
+    Build the upsert used by ``add_to_cart``.
+
+    Args:
+        user_id (int): The ID of the user whose cart is updated.
+        product_id (int): The ID of the product to add.
+        quantity (int): How many units to add.
+        dialect (str): The database dialect name.
+
+    Returns:
+        Insert: The upsert, returning the new quantity except on MySQL.
+    """
+    cart = ShoppingCart.__table__
+    source = (
+        select(literal(user_id), Product.id, literal(quantity))
+        .where(Product.id == product_id)
+    )
+    stmt = upsert(
+        ShoppingCart,
+        ['user_id', 'product_id'],
+        lambda incoming: {'quantity': cart.c.quantity + incoming.quantity, 'version': cart.c.version + 1},
+        select=source,
+        columns=['user_id', 'product_id', 'quantity'],
+        dialect=dialect,
+    )
+    if dialect == 'mysql':
+        return stmt
+    return stmt.returning(cart.c.quantity)
+
+
+def cart_quantity_query(user_id, product_id):
+    """Build the query for the quantity of one product in a user's cart."""
+    cart = ShoppingCart.__table__
+    return select(cart.c.quantity).where(cart.c.user_id == user_id, cart.c.product_id == product_id)
+
+
+def set_cart_quantity(user_id, item_id, quantity, expected_version=None):
+    """
+    Set the quantity of one line in a user's cart, and commit.
+
+    The line is read and written under its version counter. Without
+    ``expected_version`` a write that loses to a concurrent one is simply
+    re-applied to the latest row, a bounded number of times. With it, the
+    write is refused if the line changed since the client last saw it.
+
+    Args:
+        user_id (int): The ID of the user whose cart is updated.
+        item_id (int): The ID of the cart line.
+        quantity (int): The new quantity.
+        expected_version (int, optional): The version the client last read.
+
+    Returns:
+        ShoppingCart: The updated line, or None if it is not in the user's cart.
+
+    Raises:
+        VersionConflictError: If the line is no longer at ``expected_version``,
+            or every retry lost to a concurrent write.
+    """
+    def work():
+        item = ShoppingCart.query.filter_by(user_id=user_id, id=item_id).first()
+        if item is None:
+            return None
+        if expected_version is not None and item.version != expected_version:
+            raise VersionConflictError('The cart item was changed by another request', current_version=item.version)
+        item.quantity = quantity
+        db.session.flush()
+        return item
+
+    return commit_with_retry(work)
+
+
+def remove_from_cart(user_id, product_id, expected_version=None):
+    """
+    Remove a product from a user's cart, and commit.
+
+    Args:
+        user_id (int): The ID of the user whose cart is updated.
+        product_id (int): The ID of the product to remove.
+        expected_version (int, optional): The version the client last read;
+            the removal is refused if the line has changed since.
+
+    Returns:
+        bool: Whether the product was in the cart.
+
+    Raises:
+        VersionConflictError: If the line is no longer at ``expected_version``.
+    """
+    def work():
+        item = ShoppingCart.query.filter_by(user_id=user_id, product_id=product_id).first()
+        if item is None:
+            return False
+        if expected_version is not None and item.version != expected_version:
+            raise VersionConflictError('The cart item was changed by another request', current_version=item.version)
+        db.session.delete(item)
+        db.session.flush()
+        return True
+
+    return commit_with_retry(work)
+
+
+def _fold_operations(operations):
+    """Reduce an ordered list of operations to one final action per product."""
+    if not isinstance(operations, list) or not operations:
+        raise CartOperationError('operations must be a non-empty list')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise CartOperationError(f'At most {MAX_BATCH_OPERATIONS} operations are allowed per batch')
+
+    actions = {}  # product_id -> ('add', n) | ('set', n) | ('remove', None)
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise CartOperationError(f'Operation {index} must be an object')
+        op = operation.get('op')
+        product_id = operation.get('product_id')
+        quantity = operation.get('quantity', 1 if op == 'add' else None)
+        if op not in ('add', 'set', 'remove'):
+            raise CartOperationError(f"Operation {index}: op must be 'add', 'set' or 'remove'")
+        if not isinstance(product_id, int):
+            raise CartOperationError(f'Operation {index}: product_id must be an integer')
+        if op != 'remove' and (not isinstance(quantity, int) or quantity < (1 if op == 'add' else 0)):
+            raise CartOperationError(f'Operation {index}: quantity must be a positive integer')
+
+        current = actions.get(product_id)
+        if op == 'remove' or (op == 'set' and quantity == 0):
+            actions[product_id] = ('remove', None)
+        elif op == 'set':
+            actions[product_id] = ('set', quantity)
+        elif current is None:
+            actions[product_id] = ('add', quantity)
+        elif current[0] == 'remove':
+            actions[product_id] = ('set', quantity)
+        else:
+            actions[product_id] = (current[0], current[1] + quantity)
+    return actions
+
+
+def apply_cart_operations(user_id, operations):
+    """
+    Apply a batch of add, set and remove operations to a user's cart.
+
+    Operations run in order, but are first folded into one final action per
+    product, so the whole batch costs a fixed number of statements: one
+    ``IN`` query validating the products, one bulk DELETE and up to two
+    multi-row upserts. The caller commits, making the batch one transaction.
+
+    Args:
+        user_id (int): The ID of the user whose cart is updated.
+        operations (list): Dicts with ``op`` ('add', 'set' or 'remove'),
+            ``product_id`` and, for add and set, ``quantity``. Setting a
+            quantity of 0 removes the product.
+
+    Returns:
+        dict: The updated cart summary, as returned by ``get_cart_summary``.
+
+    Raises:
+        CartOperationError: If an operation is malformed.
+        UnknownProductsError: If an add or set references a missing product.
+    """
+    actions = _fold_operations(operations)
+    cart = ShoppingCart.__table__
+
+    wanted = {product_id for product_id, (action, _) in actions.items() if action != 'remove'}
+    if wanted:
+        found = set(db.session.scalars(select(Product.id).where(Product.id.in_(wanted))))
+        missing = sorted(wanted - found)
+        if missing:
+            raise UnknownProductsError(missing)
+
+    removals = [product_id for product_id, (action, _) in actions.items() if action == 'remove']
+    if removals:
+        db.session.execute(
+            delete(cart).where(cart.c.user_id == user_id, cart.c.product_id.in_(removals))
+        )
+
+    sets = [
+        {'user_id': user_id, 'product_id': product_id, 'quantity': quantity}
+        for product_id, (action, quantity) in actions.items() if action == 'set'
+    ]
+    if sets:
+        db.session.execute(
+            upsert(ShoppingCart, ['user_id', 'product_id'], lambda incoming: {'quantity': incoming.quantity, 'version': cart.c.version + 1}),
+            sets,
+        )
+
+    adds = [
+        {'user_id': user_id, 'product_id': product_id, 'quantity': quantity}
+        for product_id, (action, quantity) in actions.items() if action == 'add'
+    ]
+    if adds:
+        db.session.execute(
+            upsert(ShoppingCart, ['user_id', 'product_id'], lambda incoming: {
+                'quantity': cart.c.quantity + incoming.quantity,
+                'version': cart.c.version + 1,
+            }),
+            adds,
+        )
+
+    return get_cart_summary(user_id)
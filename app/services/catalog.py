@@ -0,0 +1,533 @@
+import base64
+import binascii
+import json
+import time
+from decimal import InvalidOperation
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, event, func, or_
+from sqlalchemy.orm import Session, attributes
+
+from app import db
+from app.models.category import Category
+from app.models.product import Product
+from app.models.types import to_decimal
+from app.services.cache import make_cache
+from app.services.pagination import Page
+from app.services.product_events import on_products_committed
+from app.services.query_audit import query_shape
+
+
+PRODUCTS_PER_PAGE = 10
+MAX_PAGE = 10000  # Deeper pages must follow cursors; keeps offsets bindable
+FEATURED_LIMIT = 5
+DEFAULT_COUNT_TTL = 300  # Seconds between refreshes of the cached product count
+
+# Catalog cache keys. Listing pages embed the listing generation, so bumping
+# it retires every cached page at once without having to find them.
+FEATURED_KEY = 'catalog:featured'
+COUNT_KEY = 'catalog:count'
+GENERATION_KEY = 'catalog:generation'
+MODIFIED_KEY = 'catalog:modified_at'
+CATEGORIES_KEY = 'catalog:categories'
+
+_CATEGORIES_CHANGED = 'catalog_categories_changed'
+
+# Each sort is backed by a composite (column, id) index on products
+SORT_COLUMNS = {
+    'name': Product.name,
+    'price': Product.price,
+}
+
+# Changes to these can move a product between listing pages or change what a
+# listing shows; other updates (stock) only retire the product's own entries
+LISTING_COLUMNS = frozenset({'name', 'price', 'description', 'category_id', 'category'})
+
+
+def init_catalog_cache(app):
+    """
+    Create the catalog cache for the app from its configuration.
+
+    ``CATALOG_CACHE_BACKEND`` selects 'memory' (an in-process LRU, the
+    default), 'redis' (shared through ``CATALOG_CACHE_URL``) or 'fakeredis'.
+
+    Args:
+        app (Flask): The application being configured.
+    """
+    app.extensions['catalog_cache'] = make_cache(
+        backend=app.config.get('CATALOG_CACHE_BACKEND', 'memory'),
+        url=app.config.get('CATALOG_CACHE_URL'),
+        max_entries=app.config.get('CATALOG_CACHE_MAX_ENTRIES', 4096),
+        default_ttl=app.config.get('CATALOG_CACHE_TTL', 300),
+    )
+
+
+def catalog_cache():
+    """Return the catalog cache of the current app."""
+    return current_app.extensions['catalog_cache']
+
+
+def product_to_dict(product):
+    """
+    Convert a product into the plain dict stored in the catalog cache.
+
+    Templates read the dict with the same attribute syntax as the model.
+    The price is kept as a decimal string so every cache backend returns
+    the same exact value.
+
+    Args:
+        product (Product): The product to convert.
+
+    Returns:
+        dict: The cached representation of the product.
+    """
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'price': str(product.price),
+        'stock': product.stock,
+        'version': product.version,
+    }
+
+
+def get_product(product_id):
+    """
+    Return a product from the cache, loading it from the database on a miss.
+
+    Args:
+        product_id (int): The ID of the product.
+
+    Returns:
+        dict: The cached product, or None if it does not exist.
+    """
+    cache = catalog_cache()
+    key = f'catalog:product:{product_id}'
+    product = cache.get(key)
+    if product is None:
+        row = db.session.get(Product, product_id)
+        if row is None:
+            return None
+        product = product_to_dict(row)
+        cache.set(key, product)
+    return product
+
+
+def product_version(product_id):
+    """
+    Return a product's row version from the catalog cache, or None if it
+    does not exist. Used to key pages that show a single product.
+    """
+    product = get_product(product_id)
+    return product['version'] if product is not None else None
+
+
+def get_featured_products(limit=FEATURED_LIMIT):
+    """
+    Return the products featured on the home page.
+
+    Args:
+        limit (int): The number of products to feature.
+
+    Returns:
+        list: The featured products as cached dicts.
+    """
+    cache = catalog_cache()
+    products = cache.get(FEATURED_KEY)
+    if products is None:
+        products = [product_to_dict(product) for product in Product.query.order_by(Product.id.asc()).limit(limit)]
+        cache.set(FEATURED_KEY, products)
+    return products
+
+
+def count_products():
+    """
+    Return the number of products, refreshed at most once per
+    ``PRODUCT_COUNT_TTL`` seconds instead of running ``COUNT(*)`` per request.
+
+    Returns:
+        int: The cached total number of products.
+    """
+    cache = catalog_cache()
+    total = cache.get(COUNT_KEY)
+    if total is None:
+        total = db.session.query(func.count(Product.id)).scalar()
+        cache.set(COUNT_KEY, total, ttl=current_app.config.get('PRODUCT_COUNT_TTL', DEFAULT_COUNT_TTL))
+    return total
+
+
+def invalidate_product_count():
+    """Force the next ``count_products`` call to recount."""
+    catalog_cache().delete(COUNT_KEY)
+
+
+def _listing_generation(cache):
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so a lost counter can never reuse an old generation
+        generation = int(time.time() * 1000)
+        cache.set(GENERATION_KEY, generation, ttl=0)
+    return generation
+
+
+def _bump_listing_generation(cache):
+    if cache.get(GENERATION_KEY) is None:
+        cache.set(GENERATION_KEY, int(time.time() * 1000), ttl=0)
+    else:
+        cache.incr(GENERATION_KEY)
+    cache.set(MODIFIED_KEY, time.time(), ttl=0)
+
+
+def catalog_version():
+    """
+    Return the current catalog version, which changes whenever the listings might.
+
+    Returns:
+        tuple: The listing generation and the UNIX time of the last change.
+    """
+    cache = catalog_cache()
+    generation = _listing_generation(cache)
+    modified_at = cache.get(MODIFIED_KEY)
+    if modified_at is None:
+        modified_at = time.time()
+        cache.set(MODIFIED_KEY, modified_at, ttl=0)
+    return generation, modified_at
+
+
+def invalidate_products(product_ids, inserted=False, deleted=False, listings=True):
+    """
+    Drop the cache entries affected by changes to the given products.
+
+    Args:
+        product_ids (iterable): IDs of the products that changed.
+        inserted (bool): Whether any of them are new products.
+        deleted (bool): Whether any of them were deleted.
+        listings (bool): Whether the changes can reorder or refilter the
+            listings. If not, only the products' own entries are dropped and
+            the listing generation is left alone.
+    """
+    cache = catalog_cache()
+    product_ids = set(product_ids)
+    cache.delete(*[f'catalog:product:{product_id}' for product_id in product_ids])
+
+    featured = cache.get(FEATURED_KEY)
+    if featured is not None:
+        featured_ids = {product['id'] for product in featured}
+        if featured_ids & product_ids or (inserted and len(featured) < FEATURED_LIMIT):
+            cache.delete(FEATURED_KEY)
+
+    if inserted or deleted:
+        cache.delete(COUNT_KEY, CATEGORIES_KEY)
+    if inserted or deleted or listings:
+        _bump_listing_generation(cache)
+
+
+def _changes_listings(change):
+    if change.action == 'stock':
+        return False
+    if change.action == 'update' and change.columns is not None:
+        return bool(change.columns & LISTING_COLUMNS)
+    return True  # Inserts, deletes and upserts whose columns are not known
+
+
+@on_products_committed
+def _invalidate_committed_products(changes):
+    if not has_app_context() or 'catalog_cache' not in current_app.extensions:
+        return
+    actions = {change.action for change in changes.values()}
+    invalidate_products(
+        changes.keys(),
+        inserted='insert' in actions,
+        deleted='delete' in actions,
+        listings=any(_changes_listings(change) for change in changes.values()),
+    )
+
+
+def get_categories():
+    """
+    Return every category with the number of products in its subtree.
+
+    The tree and its counts are built with one ``GROUP BY`` over the
+    indexed ``category_id`` and kept in the catalog cache until products
+    are added, deleted or moved, or the categories themselves change.
+
+    Returns:
+        list: Category dicts (``id``, ``name``, ``parent_id``, ``path``,
+        ``product_count``) ordered by name.
+    """
+    cache = catalog_cache()
+    categories = cache.get(CATEGORIES_KEY)
+    if categories is None:
+        counts = dict(_category_counts_query())
+        rows = Category.query.order_by(Category.name.asc(), Category.id.asc()).all()
+        by_id = {
+            row.id: {'id': row.id, 'name': row.name, 'parent_id': row.parent_id, 'path': row.path, 'product_count': 0}
+            for row in rows
+        }
+        # Roll each category's own count up to all of its ancestors
+        for row in rows:
+            own = counts.get(row.id, 0)
+            for ancestor_id in row.path.strip('/').split('/'):
+                ancestor = by_id.get(int(ancestor_id))
+                if ancestor is not None:
+                    ancestor['product_count'] += own
+        categories = list(by_id.values())
+        cache.set(CATEGORIES_KEY, categories)
+    return categories
+
+
+def _category_counts_query():
+    return (
+        db.session.query(Product.category_id, func.count(Product.id))
+        .filter(Product.category_id.isnot(None))
+        .group_by(Product.category_id)
+    )
+
+
+def get_category(category_id):
+    """
+    Return one category from the cached tree.
+
+    Args:
+        category_id (int): The ID of the category.
+
+    Returns:
+        dict: The category, or None if it does not exist.
+    """
+    return next((category for category in get_categories() if category['id'] == category_id), None)
+
+
+def get_subcategories(parent_id=None):
+    """
+    Return the direct children of a category, or the top-level categories.
+
+    Args:
+        parent_id (int, optional): The parent category's ID.
+
+    Returns:
+        list: Category dicts ordered by name.
+    """
+    return [category for category in get_categories() if category['parent_id'] == parent_id]
+
+
+def get_subtree_ids(category):
+    """
+    Return the IDs of a category and all its descendants.
+
+    Args:
+        category (dict): The category, from ``get_category``.
+
+    Returns:
+        list: The category IDs.
+    """
+    return [other['id'] for other in get_categories() if other['path'].startswith(category['path'])]
+
+
+@event.listens_for(Category, 'after_insert')
+@event.listens_for(Category, 'after_update')
+@event.listens_for(Category, 'after_delete')
+def _flag_category_change(mapper, connection, target):
+    Session.object_session(target).info[_CATEGORIES_CHANGED] = True
+
+
+@event.listens_for(Product, 'after_update')
+def _flag_product_move(mapper, connection, target):
+    if attributes.get_history(target, 'category_id').has_changes():
+        Session.object_session(target).info[_CATEGORIES_CHANGED] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_categories(session):
+    if not session.info.pop(_CATEGORIES_CHANGED, False):
+        return
+    if has_app_context() and 'catalog_cache' in current_app.extensions:
+        cache = catalog_cache()
+        cache.delete(CATEGORIES_KEY)
+        _bump_listing_generation(cache)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_category_change(session):
+    session.info.pop(_CATEGORIES_CHANGED, None)
+
+
+def encode_cursor(sort_value, product_id):
+    """
+    Encode the position after a product as an opaque, URL-safe cursor.
+
+    Args:
+        sort_value: The product's value in the active sort column.
+        product_id (int): The product's ID, used as the tiebreaker.
+
+    Returns:
+        str: The encoded cursor.
+    """
+    raw = json.dumps([sort_value, product_id], separators=(',', ':'), default=str).encode()  # Prices as exact strings
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_by=None):
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    The sort value must have the type of the sort column: a string for
+    'name', a finite amount for 'price' (returned as a ``Decimal``) and an
+    ID for anything else.
+
+    Args:
+        cursor (str): The encoded cursor.
+        sort_by (str, optional): The sort the cursor is used with.
+
+    Returns:
+        tuple: ``(sort_value, product_id)``, or None if the cursor is malformed
+        or does not fit the sort.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, product_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if not _is_int(product_id):
+        return None
+
+    sort_column = SORT_COLUMNS.get(sort_by)
+    if sort_column is Product.price:
+        if not isinstance(sort_value, (str, int, float)) or isinstance(sort_value, bool):
+            return None
+        try:
+            sort_value = to_decimal(sort_value)
+        except (InvalidOperation, ValueError):
+            return None
+        if not sort_value.is_finite():
+            return None
+    elif sort_column is Product.name:
+        if not isinstance(sort_value, str):
+            return None
+    elif not _is_int(sort_value):
+        return None
+    return sort_value, product_id
+
+
+def _is_int(value):
+    # A 64-bit integer, as the database binds it
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+
+
+def get_product_page(sort_by='name', page=1, cursor=None, per_page=PRODUCTS_PER_PAGE, category=None):
+    """
+    Fetch one page of the product listing.
+
+    With a cursor the page is located by keyset (seek) on the sort column
+    and ``id``, so deep pages cost the same as the first. Without one the
+    page number is used as an offset, as before. Either way the result
+    carries a cursor pointing after its last row, which the listing's
+    "Next" link follows. Pages are served from the catalog cache and
+    retired whenever a product is added, removed, renamed, repriced or moved.
+
+    Args:
+        sort_by (str): 'name' or 'price'; any other value lists by ID.
+        page (int): The 1-based page number, shown in the page label.
+        cursor (str, optional): Cursor from a previous page's ``next_cursor``.
+        per_page (int): The number of products per page.
+        category (dict, optional): Only list products in this category
+            (from ``get_category``) and its subcategories.
+
+    Returns:
+        Page: The requested page of products, as cached dicts.
+    """
+    page = min(max(page, 1), MAX_PAGE)
+    cache = catalog_cache()
+    sort_key = sort_by if sort_by in SORT_COLUMNS else 'id'
+    scope = category['id'] if category else 'all'
+    key = f'catalog:listing:{_listing_generation(cache)}:{scope}:{sort_key}:{page}:{cursor or ""}:{per_page}'
+    cached = cache.get(key)
+    if cached is None:
+        category_ids = get_subtree_ids(category) if category else None
+        items, next_cursor = _query_product_page(sort_by, page, cursor, per_page, category_ids)
+        cached = {'items': [product_to_dict(product) for product in items], 'next_cursor': next_cursor}
+        cache.set(key, cached)
+    total = category['product_count'] if category else count_products()
+    return Page(cached['items'], page, per_page, total, next_cursor=cached['next_cursor'])
+
+
+def product_page_query(sort_by, page, cursor, per_page, category_ids=None):
+    """
+    Build the query for one page of the product listing, plus one extra row.
+
+    Args:
+        sort_by (str): 'name' or 'price'; any other value lists by ID.
+        page (int): The 1-based page number, used when there is no cursor.
+        cursor (str, optional): Cursor from a previous page's ``next_cursor``.
+        per_page (int): The number of products per page.
+        category_ids (list, optional): Only list products in these categories.
+
+    Returns:
+        Query: The limited query.
+    """
+    sort_column = SORT_COLUMNS.get(sort_by)
+    query = Product.query
+    if category_ids is not None:
+        query = query.filter(Product.category_id.in_(category_ids))
+
+    position = decode_cursor(cursor, sort_by) if cursor else None  # Unusable cursors fall back to the page number
+    if position is not None:
+        sort_value, last_id = position
+        if sort_column is None:
+            query = query.filter(Product.id > last_id)
+        else:
+            query = query.filter(or_(
+                sort_column > sort_value,
+                and_(sort_column == sort_value, Product.id > last_id),
+            ))
+
+    if sort_column is None:
+        query = query.order_by(Product.id.asc())
+    else:
+        query = query.order_by(sort_column.asc(), Product.id.asc())
+
+    if position is None:
+        query = query.offset((page - 1) * per_page)
+
+    # Fetch one extra row to find out whether another page follows
+    return query.limit(per_page + 1)
+
+
+def _query_product_page(sort_by, page, cursor, per_page, category_ids=None):
+    sort_column = SORT_COLUMNS.get(sort_by)
+    items = product_page_query(sort_by, page, cursor, per_page, category_ids).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key) if sort_column is not None else last.id, last.id)
+    return items, next_cursor
+
+
+@query_shape('catalog.listing.name')
+def _listing_by_name_shape():
+    return product_page_query('name', 1, None, PRODUCTS_PER_PAGE).statement
+
+
+@query_shape('catalog.listing.name.cursor')
+def _listing_by_name_cursor_shape():
+    return product_page_query('name', 5, encode_cursor('m', 500), PRODUCTS_PER_PAGE).statement
+
+
+@query_shape('catalog.listing.price.cursor')
+def _listing_by_price_cursor_shape():
+    return product_page_query('price', 5, encode_cursor('10.00', 500), PRODUCTS_PER_PAGE).statement
+
+
+@query_shape('catalog.category')
+def _category_listing_shape():
+    return product_page_query('name', 1, None, PRODUCTS_PER_PAGE, category_ids=[1]).statement
+
+
+@query_shape('catalog.category.subtree')
+def _category_subtree_listing_shape():
+    return product_page_query('name', 1, None, PRODUCTS_PER_PAGE, category_ids=[1, 2, 3]).statement
+
+
+@query_shape('catalog.category.counts')
+def _category_counts_shape():
+    return _category_counts_query().statement
@@ -0,0 +1,164 @@
+from flask import current_app
+from sqlalchemy import case, delete, insert, select, update
+
+from app import db
+from app.models.order import Order
+from app.models.orderproduct import OrderProduct
+from app.models.product import Product
+from app.models.shopping_cart import ShoppingCart
+from app.models.user import User
+from app.services.jobs import enqueue, job_handler
+from app.services.notifications import payment_gateway
+from app.services.orders import record_order
+from app.services.product_events import stage_stock_changes
+from app.services.query_audit import query_shape
+
+
+class CheckoutError(Exception):
+    """Base class for reasons an order cannot be placed."""
+
+
+class EmptyCartError(CheckoutError):
+    """Raised when checking out a cart with no items."""
+
+
+class OutOfStockError(CheckoutError):
+    """
+    Raised when the cart asks for more units than are in stock.
+
+    Attributes:
+        product_ids (list): The IDs of the products that are short.
+    """
+
+    def __init__(self, product_ids):
+        super().__init__(f'Insufficient stock for products: {product_ids}')
+        self.product_ids = product_ids
+
+
+def _lock_cart_lines(user_id):
+    products = Product.__table__
+    cart = ShoppingCart.__table__
+    return (
+        select(products.c.id, products.c.price, products.c.stock, cart.c.quantity)
+        .join(cart, cart.c.product_id == products.c.id)
+        .where(cart.c.user_id == user_id)
+        .order_by(products.c.id)
+        .with_for_update()
+    )
+
+
+@query_shape('checkout.lock_cart')
+def _lock_cart_lines_shape():
+    return _lock_cart_lines(1)
+
+
+def place_order(user_id, shipping_address=None):
+    """
+    Turn a user's cart into an order, reserving stock as it goes.
+
+    Runs a fixed number of statements whatever the cart size:
+
+    1. one ``SELECT ... FOR UPDATE`` over the cart joined to its products,
+       ordered by product ID so concurrent checkouts lock rows in the same
+       order and cannot deadlock;
+    2. one conditional bulk UPDATE decrementing stock, which only matches
+       rows that still have enough units, and bumps their versions so
+       concurrent edits of those products see the change;
+    3. one INSERT for the order and one multi-row INSERT for its lines,
+       which snapshot the price paid;
+    4. one upsert adding the order to the user's order summary;
+    5. one DELETE clearing the ordered items from the cart;
+    6. the outbox jobs capturing payment and sending the confirmation email.
+
+    Slow third-party calls run later on a worker, not in the request.
+    Everything happens in the caller's transaction: the caller commits on
+    success and must roll back if this raises.
+
+    Args:
+        user_id (int): The ID of the user checking out.
+        shipping_address (str, optional): Where the order is shipped.
+
+    Returns:
+        Order: The new, flushed order.
+
+    Raises:
+        EmptyCartError: If the cart has no items.
+        OutOfStockError: If any product lacks the stock the cart asks for.
+    """
+    products = Product.__table__
+    cart = ShoppingCart.__table__
+
+    lines = db.session.execute(_lock_cart_lines(user_id)).all()
+    if not lines:
+        raise EmptyCartError('Your cart is empty')
+
+    short = [line.id for line in lines if line.stock < line.quantity]
+    if short:
+        raise OutOfStockError(short)
+
+    quantities = {line.id: line.quantity for line in lines}
+    requested = case(quantities, value=products.c.id)
+    result = db.session.execute(
+        update(products)
+        .where(products.c.id.in_(quantities), products.c.stock >= requested)
+        .values(stock=products.c.stock - requested, version=products.c.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(quantities):
+        # Only possible if the rows were not actually locked (e.g. SQLite)
+        raise OutOfStockError(sorted(quantities))
+    stage_stock_changes(db.session, quantities)
+
+    order_lines = [
+        {'product_id': line.id, 'quantity': line.quantity, 'unit_price': line.price, 'line_total': line.price * line.quantity}
+        for line in lines
+    ]
+    order = Order(
+        user_id=user_id,
+        total_price=sum(order_line['line_total'] for order_line in order_lines),
+        item_count=sum(quantities.values()),
+        status='pending',
+        shipping_address=shipping_address,
+    )
+    db.session.add(order)
+    db.session.flush()
+
+    db.session.execute(
+        insert(OrderProduct.__table__),
+        [{'order_id': order.id, **order_line} for order_line in order_lines],
+    )
+    record_order(order)
+    db.session.execute(
+        delete(cart).where(cart.c.user_id == user_id, cart.c.product_id.in_(quantities))
+    )
+
+    enqueue('capture_payment', order_id=order.id)
+    enqueue('send_order_confirmation', order_id=order.id)
+    return order
+
+
+@job_handler('capture_payment')
+def capture_payment(order_id):
+    """Capture payment for an order and mark it paid."""
+    order = db.session.get(Order, order_id)
+    if order is None or order.status != 'pending':
+        return  # Already captured by an earlier attempt, or the order is gone
+    # A retry after a capture whose commit failed must not charge again; the
+    # gateway deduplicates on the key. Fails, and is retried, until a gateway is configured
+    payment_gateway().capture(order.id, order.total_price, idempotency_key=f'order:{order.id}')
+    order.status = 'paid'
+    db.session.commit()
+
+
+@job_handler('send_order_confirmation')
+def send_order_confirmation(order_id):
+    """Email the customer a confirmation of their order."""
+    order = db.session.get(Order, order_id)
+    if order is None:
+        return
+    user = db.session.get(User, order.user_id)
+    current_app.extensions['email_sender'].send(
+        to=user.email,
+        subject=f'Your QuickShop order #{order.id}',
+        body=f'Thank you for your order of ${order.total_price}. It will be shipped to {order.shipping_address}.',
+    )
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context, session
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+
+from app import db
+from app.models.user import User
+
+
+IDENTITY_KEY = '_identity'
+DEFAULT_IDENTITY_TTL = 300  # Seconds a session snapshot is trusted before the row is re-read
+
+# user_id -> time of the last change to that user's identity in this process, oldest first
+_revoked_at = OrderedDict()
+_revoked_lock = threading.Lock()
+
+
+class SessionUser(UserMixin):
+    """
+    The logged-in user as seen by ``current_user``, rebuilt from a snapshot
+    kept in the signed session instead of a ``users`` query per request.
+
+    ``id``, ``username`` and ``email`` are always available. Any other
+    attribute (relationships, the password hash, ...) loads the full ``User``
+    row the first time it is needed.
+
+    Attributes:
+        id (int): The user's ID.
+        username (str): The user's username.
+        email (str): The user's email address.
+    """
+
+    _record = None
+
+    def __init__(self, id, username, email, record=None):
+        self.id = id
+        self.username = username
+        self.email = email
+        self._record = record
+
+    @property
+    def record(self):
+        """The full ``User`` row, loaded on first access."""
+        if self._record is None:
+            self._record = db.session.get(User, self.id)
+        return self._record
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.record, name)
+
+    def __repr__(self):
+        return f'<SessionUser {self.username}>'
+
+
+def remember_identity(user):
+    """
+    Store a snapshot of the user in the session for later requests.
+
+    Args:
+        user (User): The user who just logged in or was loaded.
+    """
+    session[IDENTITY_KEY] = {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'issued_at': time.time(),
+    }
+
+
+def forget_identity():
+    """Drop the session snapshot, e.g. on logout."""
+    session.pop(IDENTITY_KEY, None)
+
+
+def revoke_identity(user_id):
+    """
+    Stop trusting snapshots of a user issued before now, in this process.
+
+    Other worker processes stop trusting them within ``IDENTITY_CACHE_TTL``.
+    Revocations older than that are forgotten, as every snapshot they could
+    apply to has expired by then.
+
+    Args:
+        user_id (int): The ID of the user whose identity changed.
+    """
+    ttl = current_app.config.get('IDENTITY_CACHE_TTL', DEFAULT_IDENTITY_TTL) if has_app_context() else DEFAULT_IDENTITY_TTL
+    now = time.time()
+    with _revoked_lock:
+        _revoked_at[user_id] = now
+        _revoked_at.move_to_end(user_id)
+        while next(iter(_revoked_at.values())) < now - ttl:
+            _revoked_at.popitem(last=False)
+
+
+def load_identity(user_id):
+    """
+    Resolve the logged-in user for Flask-Login's ``user_loader``.
+
+    The session snapshot is used while it matches the ID, is younger than
+    ``IDENTITY_CACHE_TTL`` and predates no change to the user; otherwise the
+    row is read and the snapshot refreshed.
+
+    Args:
+        user_id (str): The user ID stored by Flask-Login.
+
+    Returns:
+        SessionUser: The user, or None if they no longer exist.
+    """
+    user_id = int(user_id)
+    snapshot = session.get(IDENTITY_KEY)
+    if snapshot and snapshot.get('id') == user_id:
+        ttl = current_app.config.get('IDENTITY_CACHE_TTL', DEFAULT_IDENTITY_TTL)
+        issued_at = snapshot.get('issued_at', 0)
+        if issued_at + ttl > time.time() and _revoked_at.get(user_id, 0) < issued_at:
+            return SessionUser(user_id, snapshot['username'], snapshot['email'])
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        forget_identity()
+        return None
+    remember_identity(user)
+    return SessionUser(user.id, user.username, user.email, record=user)
+
+
+@event.listens_for(User, 'after_update')
+def _revoke_on_change(mapper, connection, target):
+    # Profile and password changes invalidate cached snapshots of the user
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ('username', 'email', 'password')):
+        revoke_identity(target.id)
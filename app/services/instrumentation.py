@@ -0,0 +1,330 @@
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Response, abort, before_render_template, current_app, g, has_request_context, jsonify, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import db
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DEFAULT_SLOW_QUERIES = 5  # Slowest statements kept per endpoint
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5  # Identical statements in one request before it is flagged
+PROFILE_HEADER = 'X-Profile'
+DEFAULT_PROFILER_MAX_FILES = 100
+
+
+class RequestStats:
+    """
+    What one request spent on the database and on rendering templates.
+
+    Attributes:
+        started_at (float): ``perf_counter`` value when the request began.
+        db_queries (int): Statements executed.
+        db_time (float): Seconds spent in the database driver.
+        template_time (float): Seconds spent rendering templates.
+        statements (Counter): Executions per distinct SQL string.
+        slowest (list): ``(seconds, statement)`` of the slowest statements.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+        self.slowest = []
+        self.profiler = None
+        self._template_started = []
+
+    def record_query(self, statement, elapsed, keep=DEFAULT_SLOW_QUERIES):
+        self.db_queries += 1
+        self.db_time += elapsed
+        self.statements[statement] += 1
+        self.slowest.append((elapsed, statement))
+        if len(self.slowest) > keep:
+            self.slowest.sort(reverse=True)
+            del self.slowest[keep:]
+
+    def repeated_statements(self, threshold):
+        """Return ``(statement, count)`` for statements run ``threshold`` times or more."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+class MetricsRegistry:
+    """
+    Per-endpoint request metrics for this process, rendered in the
+    Prometheus text exposition format.
+
+    Each worker process keeps its own registry; Prometheus scrapes and
+    sums them per instance.
+    """
+
+    def __init__(self, slow_queries=DEFAULT_SLOW_QUERIES):
+        self._lock = threading.Lock()
+        self.slow_queries = slow_queries
+        self.requests = Counter()  # (endpoint, method, status) -> count
+        self.duration_buckets = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self.duration_sum = Counter()
+        self.db_queries = Counter()
+        self.db_time = Counter()
+        self.template_time = Counter()
+        self.n_plus_one = Counter()
+        self.slowest = defaultdict(list)  # endpoint -> [(seconds, statement)]
+
+    def observe(self, endpoint, method, status, duration, stats, repeated):
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            buckets = self.duration_buckets[endpoint]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[index] += 1
+                    break
+            else:
+                buckets[-1] += 1
+            self.duration_sum[endpoint] += duration
+            self.db_queries[endpoint] += stats.db_queries
+            self.db_time[endpoint] += stats.db_time
+            self.template_time[endpoint] += stats.template_time
+            self.n_plus_one[endpoint] += len(repeated)
+            slowest = self.slowest[endpoint]
+            slowest.extend(stats.slowest)
+            slowest.sort(reverse=True)
+            del slowest[self.slow_queries:]
+
+    def slowest_statements(self):
+        """Return the slowest statements seen per endpoint, slowest first."""
+        with self._lock:
+            return {
+                endpoint: [{'seconds': round(seconds, 6), 'statement': statement} for seconds, statement in slowest]
+                for endpoint, slowest in self.slowest.items()
+            }
+
+    def render(self):
+        """Return the metrics in the Prometheus text format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            family('quickshop_requests_total', 'counter', 'Requests handled, by endpoint, method and status.')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'quickshop_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            family('quickshop_request_duration_seconds', 'histogram', 'Time to handle a request.')
+            for endpoint, buckets in sorted(self.duration_buckets.items()):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + ('+Inf',), buckets):
+                    cumulative += count
+                    lines.append(f'quickshop_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'quickshop_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self.duration_sum[endpoint]:.6f}')
+                lines.append(f'quickshop_request_duration_seconds_count{{endpoint="{endpoint}"}} {cumulative}')
+
+            for name, values, help_text in (
+                ('quickshop_db_queries_total', self.db_queries, 'SQL statements executed.'),
+                ('quickshop_db_duration_seconds_total', self.db_time, 'Time spent executing SQL.'),
+                ('quickshop_template_duration_seconds_total', self.template_time, 'Time spent rendering templates.'),
+                ('quickshop_n_plus_one_total', self.n_plus_one, 'Statements repeated often enough within one request to suggest an N+1 pattern.'),
+            ):
+                family(name, 'counter', help_text)
+                for endpoint, value in sorted(values.items()):
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _request_stats():
+    if not has_request_context():
+        return None
+    return g.get('_request_stats')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('_query_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = _request_stats()
+    if stats is not None:
+        stats.record_query(statement, elapsed, current_app.config.get('INSTRUMENTATION_SLOW_QUERIES', DEFAULT_SLOW_QUERIES))
+
+
+def _discard_query_timer(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    # so the pooled connection's stack does not grow or pair later statements with it
+    if context.connection is None or context.execution_context is None:
+        return
+    started = context.connection.info.get('_query_started')
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """
+    Clean up the query timers of statements that fail on an engine.
+
+    The timers themselves are installed for every engine, but SQLAlchemy
+    only reports errors to listeners registered on the engine itself.
+
+    Args:
+        engine (Engine): The engine to watch.
+    """
+    if not event.contains(engine, 'handle_error', _discard_query_timer):
+        event.listen(engine, 'handle_error', _discard_query_timer)
+
+
+def _start_template_timer(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None:
+        stats._template_started.append(time.perf_counter())
+
+
+def _stop_template_timer(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None and stats._template_started:
+        stats.template_time += time.perf_counter() - stats._template_started.pop()
+
+
+def _profiling_requested(app):
+    token = app.config.get('PROFILER_TOKEN')
+    if token and hmac.compare_digest(request.headers.get(PROFILE_HEADER, ''), token):
+        return True
+    rate = app.config.get('PROFILER_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def _prune_profiles(directory, keep):
+    # Sampled profiling writes a file per request; keep only the newest
+    paths = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.prof'):
+            try:
+                paths.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass  # Pruned by another worker meanwhile
+    paths.sort()
+    for _, path in paths[:max(len(paths) - keep, 0)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _save_profile(app, profiler, response):
+    directory = os.path.join(app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{request.endpoint or "unknown"}-{os.getpid()}-{random.getrandbits(32):08x}.prof'
+    profiler.dump_stats(os.path.join(directory, name))
+    _prune_profiles(directory, app.config.get('PROFILER_MAX_FILES', DEFAULT_PROFILER_MAX_FILES))
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(20)
+    logger.info('Profile of %s %s saved as %s\n%s', request.method, request.path, name, summary.getvalue())
+    response.headers['X-Profile-File'] = name
+
+
+def init_instrumentation(app):
+    """
+    Record per-request SQL, template and timing metrics for the app.
+
+    Each request's statement count, database time, template time and
+    slowest statements are logged as one JSON line on the
+    ``app.services.instrumentation`` logger and aggregated per endpoint for
+    ``/metrics`` (Prometheus text). A statement repeated
+    ``N_PLUS_ONE_THRESHOLD`` times in one request is logged as a likely
+    N+1 query. Sending ``X-Profile: <PROFILER_TOKEN>`` runs the request
+    under cProfile and saves the stats in the instance folder;
+    ``PROFILER_SAMPLE_RATE`` profiles a random fraction of requests; only
+    the newest ``PROFILER_MAX_FILES`` profiles are kept.
+    ``/metrics`` and ``/metrics/queries`` (which shows SQL text) are only
+    registered when ``METRICS_TOKEN`` is set, and require it as a bearer
+    token.
+
+    Args:
+        app (Flask): The application being configured.
+    """
+    registry = MetricsRegistry(app.config.get('INSTRUMENTATION_SLOW_QUERIES', DEFAULT_SLOW_QUERIES))
+    app.extensions['metrics'] = registry
+    with app.app_context():
+        for engine in [*db.engines.values(), *app.extensions.get('db_replicas', [])]:
+            instrument_engine(engine)
+    before_render_template.connect(_start_template_timer, app)
+    template_rendered.connect(_stop_template_timer, app)
+
+    @app.before_request
+    def _begin_request():
+        g._request_stats = stats = RequestStats()
+        if _profiling_requested(app):
+            stats.profiler = cProfile.Profile()
+            stats.profiler.enable()
+
+    @app.after_request
+    def _finish_request(response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        if stats.profiler is not None:
+            stats.profiler.disable()
+            _save_profile(app, stats.profiler, response)
+
+        duration = time.perf_counter() - stats.started_at
+        endpoint = request.endpoint or 'unknown'
+        repeated = stats.repeated_statements(app.config.get('N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD))
+        for statement, count in repeated:
+            logger.warning('Possible N+1 in %s: statement ran %d times: %s', endpoint, count, statement)
+        registry.observe(endpoint, request.method, response.status_code, duration, stats, repeated)
+
+        logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': stats.db_queries,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+            'slowest': [{'ms': round(seconds * 1000, 2), 'statement': statement} for seconds, statement in sorted(stats.slowest, reverse=True)[:3]],
+        }))
+        return response
+
+    if not app.config.get('METRICS_TOKEN'):
+        logger.info('METRICS_TOKEN is not set; /metrics is disabled')
+        return
+
+    def _authorize():
+        token = app.config.get('METRICS_TOKEN')
+        if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+
+    @app.route('/metrics')
+    def metrics():
+        """Per-endpoint request metrics in the Prometheus text format."""
+        _authorize()
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/metrics/queries')
+    def slow_queries():
+        """The slowest SQL statements seen per endpoint, as JSON."""
+        _authorize()
+        return jsonify(registry.slowest_statements())
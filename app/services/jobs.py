@@ -0,0 +1,238 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, or_, select
+
+from app import db
+from app.models.outbox_job import OutboxJob, utcnow
+from app.services.query_audit import query_shape
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_BASE = 5  # Seconds before the first retry; doubles on each further attempt
+DEFAULT_BACKOFF_MAX = 3600
+DEFAULT_LEASE_SECONDS = 300  # A running job not finished within this is claimed again
+
+_handlers = {}
+
+
+def job_handler(kind):
+    """
+    Register the function that runs jobs of the given kind.
+
+    The handler is called with the job's payload as keyword arguments,
+    inside an application context. Raising marks the attempt as failed.
+
+    Args:
+        kind (str): The job kind the handler runs.
+
+    Returns:
+        callable: A decorator registering the handler.
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, **payload):
+    """
+    Add a job to the outbox in the current transaction.
+
+    The job becomes visible to workers only when the caller commits, so it
+    is never run for a change that was rolled back.
+
+    Args:
+        kind (str): The job kind, matching a registered handler.
+        **payload: JSON-serialisable arguments for the handler.
+
+    Returns:
+        OutboxJob: The pending job.
+    """
+    job = OutboxJob(kind=kind, payload=payload, status='pending', attempts=0, run_after=utcnow())
+    db.session.add(job)
+    return job
+
+
+def backoff_delay(attempts):
+    """
+    Return how long to wait before retrying a job that has failed ``attempts`` times.
+
+    Args:
+        attempts (int): The number of attempts made so far.
+
+    Returns:
+        float: The delay in seconds, with up to 10% jitter.
+    """
+    base = current_app.config.get('JOB_BACKOFF_BASE', DEFAULT_BACKOFF_BASE)
+    cap = current_app.config.get('JOB_BACKOFF_MAX', DEFAULT_BACKOFF_MAX)
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return delay * (1 + random.random() / 10)
+
+
+def _due_jobs(now, lease, limit):
+    return (
+        select(OutboxJob)
+        .where(or_(
+            and_(OutboxJob.status == 'pending', OutboxJob.run_after <= now),
+            and_(OutboxJob.status == 'running', OutboxJob.locked_at < now - lease),
+        ))
+        .order_by(OutboxJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+
+@query_shape('jobs.claim')
+def _due_jobs_shape():
+    return _due_jobs(utcnow(), timedelta(seconds=DEFAULT_LEASE_SECONDS), 20)
+
+
+def claim_jobs(limit):
+    """
+    Claim up to ``limit`` due jobs for this worker and commit the claim.
+
+    Rows are selected with ``FOR UPDATE SKIP LOCKED``, so concurrent workers
+    each claim different jobs without waiting on one another. Jobs whose
+    previous claim outlived the lease are treated as abandoned and claimed
+    again.
+
+    Args:
+        limit (int): The maximum number of jobs to claim.
+
+    Returns:
+        list: The IDs of the claimed jobs.
+    """
+    now = utcnow()
+    lease = timedelta(seconds=current_app.config.get('JOB_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    jobs = db.session.scalars(_due_jobs(now, lease, limit)).all()
+
+    for job in jobs:
+        job.status = 'running'
+        job.locked_at = now
+        job.attempts += 1
+    job_ids = [job.id for job in jobs]
+    db.session.commit()
+    return job_ids
+
+
+def run_job(job_id):
+    """
+    Run one claimed job and record the outcome.
+
+    On failure the job goes back to 'pending' with an exponential backoff,
+    or to 'failed' once it has used up ``JOB_MAX_ATTEMPTS``.
+
+    Args:
+        job_id (int): The ID of a job claimed by ``claim_jobs``.
+
+    Returns:
+        bool: True if the job succeeded.
+    """
+    job = db.session.get(OutboxJob, job_id)
+    if job is None or job.status != 'running':
+        return False
+
+    handler = _handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job kind {job.kind!r}')
+        handler(**job.payload)
+    except Exception as error:
+        db.session.rollback()
+        job = db.session.get(OutboxJob, job_id)
+        job.last_error = f'{type(error).__name__}: {error}'
+        if job.attempts >= current_app.config.get('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS):
+            job.status = 'failed'
+            logger.error('Job %s (%s) failed permanently: %s', job.id, job.kind, job.last_error)
+        else:
+            job.status = 'pending'
+            job.run_after = utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+            logger.warning('Job %s (%s) failed, retrying: %s', job.id, job.kind, job.last_error)
+        job.locked_at = None
+        db.session.commit()
+        return False
+
+    job.status = 'done'
+    job.locked_at = None
+    job.last_error = None
+    db.session.commit()
+    return True
+
+
+class Worker:
+    """
+    Polls the outbox and runs claimed jobs on a thread pool.
+
+    Args:
+        app (Flask): The application whose database and handlers are used.
+        threads (int): The number of jobs run concurrently.
+        batch_size (int): The maximum number of jobs claimed per poll.
+        poll_interval (float): Seconds to sleep when no jobs are due.
+    """
+
+    def __init__(self, app, threads=4, batch_size=20, poll_interval=1.0):
+        self.app = app
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._running = False
+
+    def _run_in_context(self, job_id):
+        with self.app.app_context():
+            try:
+                return run_job(job_id)
+            except Exception:
+                logger.exception('Worker crashed running job %s', job_id)
+                return False
+
+    def run_once(self, executor):
+        """Claim one batch and run it to completion; returns the number of jobs claimed."""
+        with self.app.app_context():
+            job_ids = claim_jobs(self.batch_size)
+        if job_ids:
+            wait([executor.submit(self._run_in_context, job_id) for job_id in job_ids])
+        return len(job_ids)
+
+    def run(self, once=False):
+        """
+        Process jobs until ``stop`` is called, or until the outbox has no due
+        jobs left if ``once`` is true.
+        """
+        self._running = True
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='outbox') as executor:
+            while self._running:
+                claimed = self.run_once(executor)
+                if not claimed:
+                    if once:
+                        break
+                    time.sleep(self.poll_interval)
+
+    def stop(self):
+        """Ask the worker loop to exit after the current batch."""
+        self._running = False
+
+
+jobs_cli = AppGroup('jobs', help='Background job commands.')
+
+
+@jobs_cli.command('work')
+@click.option('--threads', default=4, show_default=True, help='Jobs run concurrently.')
+@click.option('--batch-size', default=20, show_default=True, help='Jobs claimed per poll.')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds between polls when idle.')
+@click.option('--once', is_flag=True, help='Exit once no jobs are due.')
+def work_command(threads, batch_size, poll_interval, once):
+    """Run an outbox worker."""
+    worker = Worker(current_app._get_current_object(), threads=threads, batch_size=batch_size, poll_interval=poll_interval)
+    try:
+        worker.run(once=once)
+    except KeyboardInterrupt:
+        worker.stop()
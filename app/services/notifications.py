@@ -0,0 +1,89 @@
+import logging
+import threading
+
+from flask import current_app
+
+
+logger = logging.getLogger(__name__)
+
+
+class StubEmailSender:
+    """
+    Email sender that records messages instead of delivering them.
+
+    Stands in for SendGrid in development and tests; ``sent`` holds every
+    message as a dict with ``to``, ``subject`` and ``body``.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to, subject, body):
+        with self._lock:
+            self.sent.append({'to': to, 'subject': subject, 'body': body})
+        logger.info('Stub email to %s: %s', to, subject)
+
+
+class StubPaymentGateway:
+    """
+    Payment gateway that approves every capture without contacting anyone.
+
+    Stands in for Stripe in development and tests; ``captures`` holds every
+    capture as a dict with ``order_id`` and ``amount``. Like a real gateway
+    it honours idempotency keys: a repeated key returns the original
+    capture's ID without capturing again.
+    """
+
+    def __init__(self):
+        self.captures = []
+        self._captured = {}  # idempotency key -> capture ID
+        self._lock = threading.Lock()
+
+    def capture(self, order_id, amount, idempotency_key=None):
+        with self._lock:
+            if idempotency_key is not None and idempotency_key in self._captured:
+                return self._captured[idempotency_key]
+            self.captures.append({'order_id': order_id, 'amount': amount})
+            capture_id = f'stub-{order_id}-{len(self.captures)}'
+            if idempotency_key is not None:
+                self._captured[idempotency_key] = capture_id
+        logger.info('Stub capture of %s for order %s', amount, order_id)
+        return capture_id
+
+
+def init_integrations(app):
+    """
+    Attach the email sender and payment gateway used by background jobs.
+
+    Only the offline stubs ship with the app; a deployment wires real
+    clients in by replacing ``app.extensions['email_sender']`` and
+    ``app.extensions['payment_gateway']`` with objects of the same shape;
+    a gateway must pass ``idempotency_key`` on to the provider (Stripe's
+    ``Idempotency-Key``), as retried jobs rely on it not to charge twice.
+    The stub gateway approves payments without charging anyone, so it is
+    only installed when ``PAYMENT_BACKEND`` is 'stub' or the app is in
+    testing mode. Without a gateway, ``capture_payment`` jobs fail and are
+    retried, and their orders stay pending.
+
+    Args:
+        app (Flask): The application being configured.
+    """
+    app.extensions.setdefault('email_sender', StubEmailSender())
+    if app.config.get('PAYMENT_BACKEND') == 'stub' or app.testing:
+        app.extensions.setdefault('payment_gateway', StubPaymentGateway())
+    elif 'payment_gateway' not in app.extensions:
+        logger.warning('No payment gateway is configured; orders will stay pending until one is')
+
+
+def payment_gateway():
+    """
+    Return the app's payment gateway.
+
+    Raises:
+        RuntimeError: If none is configured.
+    """
+    gateway = current_app.extensions.get('payment_gateway')
+    if gateway is None:
+        raise RuntimeError("No payment gateway is configured (set PAYMENT_BACKEND='stub' for development)")
+    return gateway
@@ -0,0 +1,196 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import selectinload
+
+from app import db
+from app.models.order import Order
+from app.models.orderproduct import OrderProduct
+from app.models.product import Product
+from app.models.user_order_summary import UserOrderSummary
+from app.services.query_audit import query_shape
+from app.services.sql import upsert
+
+
+ORDERS_PER_PAGE = 20
+
+
+def get_order_page(user_id, before_id=None, per_page=ORDERS_PER_PAGE):
+    """
+    Fetch one page of a user's order history, newest first.
+
+    Pages are addressed by keyset on ``Order.id`` rather than by offset, so a
+    deep page costs the same as the first one. Order lines and their products
+    are loaded for the whole page with two ``SELECT ... IN`` queries instead
+    of one query per order and per line.
+
+    Args:
+        user_id (int): The ID of the user whose orders are listed.
+        before_id (int, optional): Only return orders with an ID below this one.
+        per_page (int): The maximum number of orders to return.
+
+    Returns:
+        tuple: The list of orders and the ``before_id`` cursor for the next
+        page, or None when this is the last page.
+    """
+    query = order_page_query(user_id, before_id).options(
+        selectinload(Order.products).selectinload(OrderProduct.product)
+    )
+
+    # Fetch one extra row to find out whether another page follows
+    orders = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(orders) > per_page:
+        orders = orders[:per_page]
+        next_cursor = orders[-1].id
+    return orders, next_cursor
+
+
+def order_page_query(user_id, before_id=None):
+    """
+    Build the query for a user's orders, newest first, served by the
+    ``(user_id, id)`` index.
+
+    Args:
+        user_id (int): The ID of the user whose orders are listed.
+        before_id (int, optional): Only include orders with an ID below this one.
+
+    Returns:
+        Query: The unlimited query.
+    """
+    query = Order.query.filter(Order.user_id == user_id).order_by(Order.id.desc())
+    if before_id is not None:
+        query = query.filter(Order.id < before_id)
+    return query
+
+
+@query_shape('orders.page')
+def _order_page_shape():
+    return order_page_query(1, before_id=1000).limit(ORDERS_PER_PAGE + 1).statement
+
+
+def order_lines_query(order_ids):
+    """
+    Build the query for the lines of several orders with their product names.
+
+    Args:
+        order_ids (list): The IDs of the orders.
+
+    Returns:
+        Select: One row per line, grouped by order.
+    """
+    return (
+        select(
+            OrderProduct.order_id,
+            OrderProduct.product_id,
+            Product.name,
+            OrderProduct.quantity,
+            OrderProduct.unit_price,
+            OrderProduct.line_total,
+        )
+        .join(Product, Product.id == OrderProduct.product_id)
+        .where(OrderProduct.order_id.in_(order_ids))
+        .order_by(OrderProduct.order_id, OrderProduct.id)
+    )
+
+
+@query_shape('orders.lines')
+def _order_lines_shape():
+    # The statement selectinload issues for a page of orders
+    return select(OrderProduct).where(OrderProduct.order_id.in_([1, 2, 3]))
+
+
+def get_order_summary(user_id):
+    """
+    Return a user's order aggregates with a single primary-key lookup.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        UserOrderSummary: The summary, or None if the user has never ordered.
+    """
+    return db.session.get(UserOrderSummary, user_id)
+
+
+def record_order(order):
+    """
+    Add a newly placed order to its user's summary row.
+
+    A single upsert, so concurrent checkouts by the same user cannot lose
+    each other's increments. Runs in the caller's transaction, which keeps
+    the summary consistent with the orders table.
+
+    Args:
+        order (Order): The flushed order, with ``item_count`` and ``created_at`` set.
+    """
+    summaries = UserOrderSummary.__table__
+    stmt = upsert(UserOrderSummary, ['user_id'], lambda incoming: {
+        'order_count': summaries.c.order_count + incoming.order_count,
+        'item_count': summaries.c.item_count + incoming.item_count,
+        'total_spent': summaries.c.total_spent + incoming.total_spent,
+        'last_order_id': incoming.last_order_id,
+        'last_order_at': incoming.last_order_at,
+    })
+    db.session.execute(stmt, {
+        'user_id': order.user_id,
+        'order_count': 1,
+        'item_count': order.item_count,
+        'total_spent': order.total_price,
+        'last_order_id': order.id,
+        'last_order_at': order.created_at,
+    })
+
+
+def rebuild_order_summaries(user_id=None):
+    """
+    Recompute order item counts and user summaries from the order history.
+
+    Used to backfill after a migration or to repair drift; the running
+    totals are otherwise maintained by ``record_order``. Runs in the
+    caller's transaction.
+
+    Args:
+        user_id (int, optional): Only rebuild this user's rows.
+
+    Returns:
+        int: The number of summary rows written.
+    """
+    orders = Order.__table__
+    lines = OrderProduct.__table__
+    summaries = UserOrderSummary.__table__
+
+    units = select(func.coalesce(func.sum(lines.c.quantity), 0)).where(lines.c.order_id == orders.c.id).scalar_subquery()
+    refresh_counts = update(orders).values(item_count=units)
+    clear = delete(summaries)
+    totals = select(
+        orders.c.user_id,
+        func.count(orders.c.id),
+        func.coalesce(func.sum(orders.c.item_count), 0),
+        func.coalesce(func.sum(orders.c.total_price), 0),
+        func.max(orders.c.id),
+        func.max(orders.c.created_at),
+    ).group_by(orders.c.user_id)
+    if user_id is not None:
+        refresh_counts = refresh_counts.where(orders.c.user_id == user_id)
+        clear = clear.where(summaries.c.user_id == user_id)
+        totals = totals.where(orders.c.user_id == user_id)
+
+    db.session.execute(refresh_counts.execution_options(synchronize_session=False))
+    db.session.execute(clear.execution_options(synchronize_session=False))
+    result = db.session.execute(insert(summaries).from_select(
+        ['user_id', 'order_count', 'item_count', 'total_spent', 'last_order_id', 'last_order_at'], totals,
+    ))
+    return result.rowcount
+
+
+orders_cli = AppGroup('orders', help='Order commands.')
+
+
+@orders_cli.command('rebuild-summaries')
+@click.option('--user-id', type=int, help='Only rebuild this user.')
+def rebuild_summaries_command(user_id):
+    """Recompute order item counts and per-user order summaries."""
+    count = rebuild_order_summaries(user_id)
+    db.session.commit()
+    click.echo(f'Rebuilt {count} user order summaries')
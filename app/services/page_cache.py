@@ -0,0 +1,82 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from app.services.catalog import catalog_cache, catalog_version
+
+
+DEFAULT_PAGE_CACHE_TTL = 300
+
+
+def _page_digest(view_args):
+    args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+    path = ','.join(f'{name}={value}' for name, value in sorted(view_args.items()))
+    return hashlib.sha1(f'{request.endpoint}|{path}|{args}'.encode()).hexdigest()
+
+
+def cached_page(view=None, *, version=None):
+    """
+    Cache the rendered output of a catalog view for anonymous visitors.
+
+    Pages are keyed by endpoint, view arguments and query string, and carry
+    an ETag and Last-Modified header derived from the catalog version, so a
+    revalidating client gets a 304 without the page being rendered or even
+    looked up. Changes that can alter the listings move the catalog version
+    and retire every cached page. Logged-in users, non-GET requests and
+    visitors with flashed messages waiting bypass the cache, and a render
+    that starts a session or sets a cookie is sent uncached so one
+    visitor's state is never shared with the next.
+
+    Pages showing a single product pass ``version``, a callable taking the
+    view arguments and returning that product's row version; it joins the
+    key and ETag so changes such as stock movements retire just that page.
+    Such pages carry no Last-Modified, which would not see those changes.
+
+    Args:
+        view (callable): The view function to wrap.
+        version (callable, optional): Returns a version for the view arguments.
+
+    Returns:
+        callable: The wrapped view, or a decorator if ``view`` is omitted.
+    """
+    if view is None:
+        return lambda view: cached_page(view, version=version)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Pending flash messages are shown, and cleared, only by a real render
+        if request.method not in ('GET', 'HEAD') or current_user.is_authenticated or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        generation, modified_at = catalog_version()
+        if version is not None:
+            generation = f'{generation}.{version(**kwargs)}'
+        digest = _page_digest(kwargs)
+        key = f'page:{generation}:{digest}'
+        etag = f'{digest[:16]}-{generation}'
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            cache = catalog_cache()
+            entry = cache.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or session.modified or 'Set-Cookie' in response.headers:
+                    return response
+                entry = {'body': response.get_data(as_text=True), 'mimetype': response.mimetype}
+                cache.set(key, entry, ttl=current_app.config.get('PAGE_CACHE_TTL', DEFAULT_PAGE_CACHE_TTL))
+            response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+
+        response.set_etag(etag)
+        if version is None:
+            response.last_modified = datetime.fromtimestamp(int(modified_at), tz=timezone.utc)
+        response.cache_control.public = True
+        response.cache_control.no_cache = True  # Always revalidate; the ETag makes that cheap
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
+
+    return wrapper
@@ -0,0 +1,51 @@
+import math
+
+
+class Page:
+    """
+    A page of results exposing the same attributes as Flask-SQLAlchemy's
+    ``Pagination`` so templates can render either one.
+
+    Attributes:
+        items (list): The results on this page.
+        page (int): The 1-based page number.
+        per_page (int): The maximum number of results per page.
+        total (int): The total number of results across all pages.
+        next_cursor (str): Opaque cursor for the following page, if any.
+    """
+
+    def __init__(self, items, page, per_page, total, next_cursor=None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.next_cursor = next_cursor
+
+    @property
+    def pages(self):
+        """The total number of pages."""
+        if not self.total:
+            return 0
+        return math.ceil(self.total / self.per_page)
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None or self.page < self.pages
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __repr__(self):
+        return f'<Page {self.page} of {self.pages}>'
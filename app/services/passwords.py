@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.services.cache import make_cache
+
+
+DEFAULT_HASH_METHOD = 'scrypt'
+DEFAULT_HASH_WORKERS = 2
+DEFAULT_HASH_TIMEOUT = 5  # Seconds to wait for a free slot and for the hash itself
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing pool is saturated and the request should be shed."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a bounded pool of worker processes.
+
+    Hashing is deliberately expensive; running it on separate processes keeps
+    a burst of logins from occupying the web workers' CPU and GIL. At most
+    ``max_pending`` hashes are queued or running at once; further callers
+    wait up to ``timeout`` seconds for a slot, and for their hash, and then
+    get ``HashingBusyError``.
+
+    Args:
+        method (str): Werkzeug hash method including its cost parameters,
+            e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'.
+        workers (int): Size of the process pool; 0 hashes in the calling thread.
+        max_pending (int): Hashes allowed in flight at once.
+        timeout (float): Seconds to wait for a slot and for each result.
+    """
+
+    def __init__(self, method=DEFAULT_HASH_METHOD, workers=DEFAULT_HASH_WORKERS, max_pending=None, timeout=DEFAULT_HASH_TIMEOUT):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending or max(workers, 1) * 4)
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self._prefix = None
+
+    def _pool(self):
+        # Pools do not survive a fork, so each (gunicorn) worker process builds its own
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusyError('Password hashing is saturated')
+        try:
+            future = self._pool().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job finishes or is dropped, not just while
+        # we wait, so a timed-out hash still counts against ``max_pending``
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()  # Drops the job if it has not started yet
+            raise HashingBusyError('Password hashing timed out')
+
+    def hash(self, password):
+        """Return a new hash of the password using the configured method."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Return whether the password matches the stored hash."""
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Return whether the stored hash was made with other cost parameters."""
+        if self._prefix is None:
+            # Werkzeug fills in default parameters, so derive the full prefix from a
+            # real hash; done on first use rather than in create_app, as it is slow
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+class LoginThrottle:
+    """
+    Counts failed logins per client IP and per account in fixed windows, so
+    abusive clients are turned away before any hashing is done.
+
+    Args:
+        store: A ``LocalCache`` or ``RedisCache`` holding the counters.
+        window (int): Length of a counting window in seconds.
+        max_per_ip (int): Failures allowed per IP address per window.
+        max_per_account (int): Failures allowed per account per window.
+    """
+
+    def __init__(self, store, window=300, max_per_ip=50, max_per_account=5):
+        self.store = store
+        self.window = window
+        self.max_per_ip = max_per_ip
+        self.max_per_account = max_per_account
+
+    def _keys(self, ip, account):
+        bucket = int(time.time() // self.window)
+        return f'login:ip:{ip}:{bucket}', f'login:account:{account.lower()}:{bucket}'
+
+    def is_blocked(self, ip, account):
+        """Return whether the IP or the account has used up its failures."""
+        ip_key, account_key = self._keys(ip, account)
+        return (self.store.get(ip_key) or 0) >= self.max_per_ip or (self.store.get(account_key) or 0) >= self.max_per_account
+
+    def record_failure(self, ip, account):
+        """Count a failed login against both the IP and the account."""
+        for key in self._keys(ip, account):
+            self.store.incr(key, ttl=self.window)  # The first failure in the window starts its expiry
+
+    def reset(self, account):
+        """Clear an account's failures after a successful login."""
+        self.store.delete(self._keys('', account)[1])
+
+
+def init_password_hashing(app):
+    """
+    Create the password hasher and login throttle for the app.
+
+    Args:
+        app (Flask): The application being configured.
+    """
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', DEFAULT_HASH_WORKERS),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING'),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', DEFAULT_HASH_TIMEOUT),
+    )
+    window = app.config.get('LOGIN_THROTTLE_WINDOW', 300)
+    app.extensions['login_throttle'] = LoginThrottle(
+        make_cache(
+            backend=app.config.get('LOGIN_THROTTLE_BACKEND', 'memory'),
+            url=app.config.get('LOGIN_THROTTLE_URL'),
+            default_ttl=window,
+        ),
+        window=window,
+        max_per_ip=app.config.get('LOGIN_MAX_FAILURES_PER_IP', 50),
+        max_per_account=app.config.get('LOGIN_MAX_FAILURES_PER_ACCOUNT', 5),
+    )
+
+
+def password_hasher():
+    """Return the password hasher of the current app."""
+    return current_app.extensions['password_hasher']
+
+
+def login_throttle():
+    """Return the login throttle of the current app."""
+    return current_app.extensions['login_throttle']
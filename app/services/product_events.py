@@ -0,0 +1,108 @@
+from collections import namedtuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+
+
+# ``columns`` names the attributes an update changed; None means unknown, i.e. possibly any
+ProductChange = namedtuple('ProductChange', ['product_id', 'action', 'name', 'description', 'columns'], defaults=(None,))
+
+_PENDING_KEY = 'product_changes_pending'
+_listeners = []
+
+
+def on_products_committed(func):
+    """
+    Register a callback run after a transaction that changed products commits.
+
+    The callback receives a dict mapping product IDs to ``ProductChange``
+    tuples, whose ``action`` is 'insert', 'update' or 'delete', or 'stock'
+    for bulk stock updates staged by ``stage_stock_changes``. ``columns``
+    holds the attributes an update changed, when they are known. Changes
+    are staged while the session flushes and dropped on rollback, so
+    listeners never see writes that did not reach the database.
+
+    Args:
+        func (callable): The callback to register.
+
+    Returns:
+        callable: ``func`` unchanged, so this can be used as a decorator.
+    """
+    _listeners.append(func)
+    return func
+
+
+def _stage(target, action, columns=None):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    previous = pending.get(target.id)
+    if previous is not None and action == 'update':
+        if previous.action == 'insert':
+            action, columns = 'insert', None  # Still new as far as anything outside this transaction knows
+        elif previous.columns is not None and columns is not None:
+            columns = previous.columns | columns  # Flushed more than once; the change covers every flush
+        else:
+            columns = None
+    pending[target.id] = ProductChange(target.id, action, target.name, target.description, columns)
+
+
+def stage_stock_changes(session, product_ids):
+    """
+    Record stock changes made by bulk UPDATE statements, which bypass the
+    ORM events, so listeners still hear about them once the session commits.
+
+    Args:
+        session (Session): The session the UPDATE ran in.
+        product_ids (iterable): IDs of the products whose stock changed.
+    """
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for product_id in product_ids:
+        pending.setdefault(product_id, ProductChange(product_id, 'stock', None, None, frozenset({'stock'})))
+
+
+def stage_product_changes(session, changes):
+    """
+    Record product rows written by bulk INSERT or upsert statements, which
+    bypass the ORM events, so listeners still hear about them on commit.
+
+    Args:
+        session (Session): The session the statements ran in.
+        changes (iterable): ``ProductChange`` tuples for the written rows.
+    """
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for change in changes:
+        pending[change.product_id] = change
+
+
+@event.listens_for(Product, 'after_insert')
+def _stage_insert(mapper, connection, target):
+    _stage(target, 'insert')
+
+
+@event.listens_for(Product, 'after_update')
+def _stage_update(mapper, connection, target):
+    state = inspect(target)
+    _stage(target, 'update', frozenset(attr.key for attr in state.attrs if attr.history.has_changes()))
+
+
+@event.listens_for(Product, 'after_delete')
+def _stage_delete(mapper, connection, target):
+    _stage(target, 'delete')
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+    for listener in _listeners:
+        listener(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,293 @@
+import csv
+import json
+import os
+from decimal import InvalidOperation
+from itertools import islice
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+
+from app import db
+from app.models.product import Product
+from app.models.types import to_decimal
+from app.services.product_events import ProductChange, stage_product_changes
+from app.services.sql import upsert
+
+
+DEFAULT_CHUNK_SIZE = 1000
+FIELDS = ['sku', 'name', 'description', 'price', 'stock']
+FORMATS = ('csv', 'jsonl')
+MAX_STOCK = 2 ** 31 - 1  # stock is a 32-bit INTEGER column
+
+
+class ProductRecordError(ValueError):
+    """Raised for an input record that cannot be imported."""
+
+
+class ImportStats:
+    """
+    Running totals of a product import.
+
+    Attributes:
+        inserted (int): New products created.
+        updated (int): Existing products overwritten.
+        skipped (int): Records rejected as invalid.
+        errors (list): ``(line, message)`` for the first rejected records.
+    """
+
+    MAX_ERRORS = 20
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []
+
+    @property
+    def processed(self):
+        return self.inserted + self.updated + self.skipped
+
+    def reject(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append((line, message))
+
+
+def read_records(stream, fmt):
+    """
+    Yield ``(line, record)`` pairs from a CSV or JSON Lines stream, one at a time.
+
+    Args:
+        stream: A text file object.
+        fmt (str): 'csv' (with a header row) or 'jsonl'.
+
+    Yields:
+        tuple: The record's line number and its fields as a dict, or an
+        error message instead of the dict when the line cannot be parsed.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError as exc:
+            yield line, f'invalid JSON: {exc}'
+            continue
+        yield line, record if isinstance(record, dict) else 'expected a JSON object'
+
+
+def clean_record(record):
+    """
+    Validate an input record and convert it to column values.
+
+    Args:
+        record (dict): The raw fields; ``sku``, ``name`` and ``price`` are required.
+
+    Returns:
+        dict: Values for every column in ``FIELDS``.
+
+    Raises:
+        ProductRecordError: If a field is missing or malformed.
+    """
+    sku = str(record.get('sku') or '').strip()
+    name = str(record.get('name') or '').strip()
+    if not sku:
+        raise ProductRecordError('sku is required')
+    if len(sku) > 64:
+        raise ProductRecordError('sku is longer than 64 characters')
+    if not name:
+        raise ProductRecordError('name is required')
+    description = record.get('description')
+    if description is not None and not isinstance(description, str):
+        raise ProductRecordError('description must be text')
+    try:
+        price = to_decimal(record.get('price'))
+        stock = int(record.get('stock') or 0)
+        negative = price < 0 or stock < 0
+    except (InvalidOperation, TypeError, ValueError):
+        raise ProductRecordError('price and stock must be numbers')
+    if negative:
+        raise ProductRecordError('price and stock cannot be negative')
+    if stock > MAX_STOCK:
+        raise ProductRecordError(f'stock cannot exceed {MAX_STOCK}')
+    return {
+        'sku': sku,
+        'name': name[:100],
+        'description': description or None,
+        'price': price,
+        'stock': stock,
+    }
+
+
+def _import_chunk(rows):
+    skus = list(rows)
+    existing = set(db.session.execute(select(Product.sku).where(Product.sku.in_(skus))).scalars())
+
+    stmt = upsert(Product, ['sku'], lambda incoming: {
+        'name': incoming.name,
+        'description': incoming.description,
+        'price': incoming.price,
+        'stock': incoming.stock,
+        'version': Product.__table__.c.version + 1,  # Bulk writes bypass the ORM's version counter
+    })
+    db.session.execute(stmt, list(rows.values()))  # One executemany for the whole chunk
+
+    # The bulk upsert skips the ORM events; stage the changes so the catalog
+    # cache and search index are brought up to date when the chunk commits
+    ids = db.session.execute(select(Product.id, Product.sku).where(Product.sku.in_(skus))).all()
+    stage_product_changes(db.session, [
+        ProductChange(product_id, 'update' if sku in existing else 'insert', rows[sku]['name'], rows[sku]['description'])
+        for product_id, sku in ids
+    ])
+    return len(skus) - len(existing), len(existing)
+
+
+def import_products(records, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Upsert products from a stream of records, matched on their SKU.
+
+    Records are validated and written ``chunk_size`` at a time, each chunk
+    as a single batched upsert committed on its own, so memory use stays
+    flat however large the input and an interrupted import keeps the chunks
+    already done. Within a chunk the last record for a SKU wins.
+
+    Args:
+        records (iterable): ``(line, record)`` pairs as from ``read_records``.
+        chunk_size (int): Records written per statement and transaction.
+        progress (callable, optional): Called with the ``ImportStats`` after each chunk.
+
+    Returns:
+        ImportStats: The totals of the import.
+    """
+    stats = ImportStats()
+    records = iter(records)
+    while True:
+        batch = list(islice(records, chunk_size))
+        if not batch:
+            break
+        rows = {}
+        for line, record in batch:
+            if isinstance(record, str):
+                stats.reject(line, record)
+                continue
+            try:
+                row = clean_record(record)
+            except ProductRecordError as exc:
+                stats.reject(line, str(exc))
+                continue
+            if row['sku'] in rows:
+                stats.updated += 1  # Superseded by a later record in the same chunk
+            rows[row['sku']] = row
+        if rows:
+            inserted, updated = _import_chunk(rows)
+            db.session.commit()
+            stats.inserted += inserted
+            stats.updated += updated
+        if progress:
+            progress(stats)
+    return stats
+
+
+def iter_products(chunk_size=DEFAULT_CHUNK_SIZE, fields=FIELDS):
+    """
+    Yield every product as a dict of ``fields``, in ID order.
+
+    Rows are read by keyset in chunks of ``chunk_size``, so neither the
+    process nor the database cursor ever holds the whole table. Only the
+    requested columns (and the ID) are selected.
+
+    Args:
+        chunk_size (int): Rows fetched per query.
+        fields (list): Product column names to include.
+
+    Yields:
+        dict: The product's requested fields.
+    """
+    columns = [Product.id] + [getattr(Product, field) for field in fields if field != 'id']
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns).where(Product.id > last_id).order_by(Product.id.asc()).limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        for row in rows:
+            yield {field: getattr(row, field) for field in fields}
+        last_id = rows[-1].id
+
+
+def export_products(stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Write every product to a stream as CSV or JSON Lines.
+
+    Args:
+        stream: A text file object.
+        fmt (str): 'csv' or 'jsonl'.
+        chunk_size (int): Rows fetched per query.
+        progress (callable, optional): Called with the running row count after each chunk.
+
+    Returns:
+        int: The number of products written.
+    """
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+    count = 0
+    for product in iter_products(chunk_size):
+        if writer:
+            writer.writerow(product)
+        else:
+            stream.write(json.dumps(product, default=str) + '\n')  # Prices as exact decimal strings
+        count += 1
+        if progress and count % chunk_size == 0:
+            progress(count)
+    if progress:
+        progress(count)
+    return count
+
+
+def _detect_format(filename, fmt):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+products_cli = AppGroup('products', help='Product catalog commands.')
+
+
+@products_cli.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Input format; guessed from the file name by default.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Records per batch.')
+def import_command(source, fmt, chunk_size):
+    """Upsert products from a CSV or JSON Lines file (- for stdin), matched on SKU."""
+    fmt = _detect_format(source.name, fmt)
+
+    def report(stats):
+        click.echo(f'{stats.processed} records: {stats.inserted} inserted, {stats.updated} updated, {stats.skipped} skipped', err=True)
+
+    stats = import_products(read_records(source, fmt), chunk_size=chunk_size, progress=report)
+    for line, message in stats.errors:
+        click.echo(f'line {line}: {message}', err=True)
+    if stats.skipped > len(stats.errors):
+        click.echo(f'... and {stats.skipped - len(stats.errors)} more rejected records', err=True)
+
+
+@products_cli.command('export')
+@click.argument('destination', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Output format; guessed from the file name by default.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Rows per query.')
+def export_command(destination, fmt, chunk_size):
+    """Stream every product to a CSV or JSON Lines file (stdout by default)."""
+    fmt = _detect_format(destination.name, fmt)
+    export_products(destination, fmt, chunk_size=chunk_size, progress=lambda count: click.echo(f'{count} products exported', err=True))
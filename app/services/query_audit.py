@@ -0,0 +1,135 @@
+import click
+from flask.cli import with_appcontext
+
+from app import db
+
+
+_shapes = {}
+
+
+def query_shape(name):
+    """
+    Register a hot-path query for ``flask db-audit`` to EXPLAIN.
+
+    The decorated function takes no arguments and returns the statement
+    as the application builds it, filled with representative values, so
+    the audit follows the real query rather than a copy of it.
+
+    Args:
+        name (str): A short label for the query, e.g. 'orders.page'.
+
+    Returns:
+        callable: A decorator registering the function.
+    """
+    def decorator(func):
+        _shapes[name] = func
+        return func
+    return decorator
+
+
+class PlanReport:
+    """
+    The outcome of EXPLAINing one query shape.
+
+    Attributes:
+        name (str): The registered name of the query.
+        plan (list): The plan, one string per step.
+        full_scans (list): Plan steps that read a whole table.
+        sorts (list): Plan steps that sort rows outside an index.
+    """
+
+    def __init__(self, name, plan, full_scans, sorts):
+        self.name = name
+        self.plan = plan
+        self.full_scans = full_scans
+        self.sorts = sorts
+
+
+def _explain_sqlite(connection, sql):
+    plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+    # "SCAN t" reads the table; "SCAN t USING INDEX ..." walks an index in order
+    full_scans = [step for step in plan if step.startswith('SCAN ') and ' USING ' not in step]
+    sorts = [step for step in plan if 'TEMP B-TREE' in step]
+    return plan, full_scans, sorts
+
+
+def _explain_mysql(connection, sql):
+    rows = connection.exec_driver_sql(f'EXPLAIN {sql}').mappings().all()
+    plan = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}".strip() for row in rows]
+    full_scans = [step for step, row in zip(plan, rows) if row['type'] == 'ALL']
+    sorts = [step for step, row in zip(plan, rows) if 'filesort' in (row['Extra'] or '')]
+    return plan, full_scans, sorts
+
+
+def _explain_postgresql(connection, sql):
+    plan = [row[0] for row in connection.exec_driver_sql(f'EXPLAIN {sql}')]
+    full_scans = [step for step in plan if 'Seq Scan' in step]
+    sorts = [step for step in plan if step.strip().startswith('Sort') or '-> Sort' in step]
+    return plan, full_scans, sorts
+
+
+_EXPLAINERS = {
+    'sqlite': _explain_sqlite,
+    'mysql': _explain_mysql,
+    'postgresql': _explain_postgresql,
+}
+
+
+def audit_queries(names=None):
+    """
+    EXPLAIN every registered query shape against the primary database.
+
+    Args:
+        names (iterable, optional): Only audit these shapes.
+
+    Returns:
+        list: A ``PlanReport`` per audited shape, in name order.
+
+    Raises:
+        NotImplementedError: If the database dialect has no EXPLAIN parser.
+    """
+    engine = db.engine
+    explain = _EXPLAINERS.get(engine.dialect.name)
+    if explain is None:
+        raise NotImplementedError(f'EXPLAIN is not supported on {engine.dialect.name}')
+
+    reports = []
+    with engine.connect() as connection:
+        for name in sorted(names or _shapes):
+            stmt = _shapes[name]()
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+            reports.append(PlanReport(name, *explain(connection, sql)))
+        connection.rollback()
+    return reports
+
+
+@click.command('db-audit')
+@click.option('--verbose', '-v', is_flag=True, help='Print every plan, not just the flagged ones.')
+@click.option('--strict', is_flag=True, help='Also fail on sorts that do not use an index.')
+@click.argument('names', nargs=-1)
+@with_appcontext
+def audit_command(verbose, strict, names):
+    """EXPLAIN the registered hot-path queries and flag full table scans."""
+    unknown = set(names) - set(_shapes)
+    if unknown:
+        raise click.BadParameter(f'unknown query shapes: {", ".join(sorted(unknown))}', param_hint='NAMES')
+
+    failed = 0
+    for report in audit_queries(names):
+        flagged = report.full_scans or (strict and report.sorts)
+        if report.full_scans:
+            status = 'FULL SCAN'
+        elif report.sorts:
+            status = 'SORT'
+        else:
+            status = 'ok'
+        click.echo(f'{status:9}  {report.name}')
+        if verbose or status != 'ok':
+            for step in report.plan:
+                click.echo(f'           {step}')
+        failed += bool(flagged)
+
+    if db.engine.dialect.name == 'mysql':
+        click.echo('Plans depend on table statistics; audit against production-sized data.', err=True)
+    if failed:
+        raise SystemExit(f'{failed} query shape(s) need an index')
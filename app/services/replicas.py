@@ -0,0 +1,114 @@
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, create_engine, event
+
+
+STICKY_SESSION_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a read replica when the current view allows it.
+
+    Reads are routed only when ``use_replica`` has flagged the session, the
+    app has replicas configured and the session has not written anything
+    yet; writes, locking reads and everything after a write go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and self.info.get('use_replica')
+            and not self.info.get('has_writes')
+            and not self._flushing
+            and (clause is None or (isinstance(clause, Select) and clause._for_update_arg is None))
+        ):
+            replicas = current_app.extensions.get('db_replicas')
+            if replicas:
+                return random.choice(replicas)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _record_flush(session, flush_context):
+    session.info['has_writes'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _record_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['has_writes'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    # Keep this user's reads on the primary until the replicas have caught up
+    if session.info.pop('has_writes', False) and has_request_context():
+        flask_session[STICKY_SESSION_KEY] = time.time() + current_app.config.get('REPLICA_STICKINESS_SECONDS', 10)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_writes(session):
+    session.info.pop('has_writes', None)
+
+
+def init_replicas(app, options=None):
+    """
+    Create engines for the read replicas listed in ``DATABASE_REPLICA_URLS``.
+
+    Args:
+        app (Flask): The application being configured.
+        options (dict, optional): ``create_engine`` keyword arguments; the
+            primary's engine options by default.
+    """
+    if options is None:
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    app.extensions['db_replicas'] = [
+        create_engine(url, **options) for url in app.config.get('DATABASE_REPLICA_URLS', [])
+    ]
+
+
+@contextmanager
+def replica_reads():
+    """
+    Let the queries run inside the block go to a read replica.
+
+    ``use_replica`` applies this to a whole view; streamed responses, whose
+    generators run after the view has returned, enter it themselves.
+    Users who wrote within the last ``REPLICA_STICKINESS_SECONDS`` keep
+    reading from the primary.
+    """
+    from app import db
+
+    if flask_session.get(STICKY_SESSION_KEY, 0) < time.time():
+        db.session.info['use_replica'] = True
+    try:
+        yield
+    finally:
+        db.session.info.pop('use_replica', None)
+
+
+def use_replica(view):
+    """
+    Let a read-only view run its queries on a read replica.
+
+    Users who wrote within the last ``REPLICA_STICKINESS_SECONDS`` keep
+    reading from the primary so they always see their own changes.
+
+    Args:
+        view (callable): The view function to wrap.
+
+    Returns:
+        callable: The wrapped view.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,298 @@
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.dialects.mysql import match
+
+from app import db
+from app.models.product import Product
+from app.services.catalog import MAX_PAGE, SORT_COLUMNS
+from app.services.pagination import Page
+from app.services.product_events import on_products_committed
+
+
+SEARCH_PER_PAGE = 10
+SORT_KEY_CHUNK_SIZE = 500  # IDs bound per sort-key lookup; under SQLite's oldest variable limit
+NAME_WEIGHT = 2  # A hit in the product name counts double a hit in the description
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list: The tokens in order of appearance.
+    """
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """
+    In-process inverted index over product names and descriptions.
+
+    Used when the database has no FULLTEXT support (SQLite in development and
+    tests). Query tokens match as prefixes, every token must match, and
+    results are ranked by weighted term frequency times inverse document
+    frequency.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}  # token -> {product_id: weighted term frequency}
+        self._documents = {}  # product_id -> Counter of weighted terms
+        self._vocabulary = []  # Sorted tokens, used for prefix lookups
+        self.loaded = False
+
+    def _terms(self, name, description):
+        terms = Counter()
+        for token in tokenize(name):
+            terms[token] += NAME_WEIGHT
+        for token in tokenize(description):
+            terms[token] += 1
+        return terms
+
+    def _remove(self, product_id):
+        terms = self._documents.pop(product_id, None)
+        if not terms:
+            return
+        for token in terms:
+            postings = self._postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _add(self, product_id, name, description):
+        self._remove(product_id)
+        terms = self._terms(name, description)
+        self._documents[product_id] = terms
+        for token, weight in terms.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                insort(self._vocabulary, token)
+            self._postings[token][product_id] = weight
+
+    def load(self, rows):
+        """Replace the index contents with ``(id, name, description)`` rows."""
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._vocabulary.clear()
+            for product_id, name, description in rows:
+                self._add(product_id, name, description)
+            self.loaded = True
+
+    def update(self, product_id, name, description):
+        """Index or re-index a single product."""
+        with self._lock:
+            self._add(product_id, name, description)
+
+    def remove(self, product_id):
+        """Drop a product from the index."""
+        with self._lock:
+            self._remove(product_id)
+
+    def reset(self):
+        """Forget everything so the next search reloads from the database."""
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._vocabulary.clear()
+            self.loaded = False
+
+    def _prefix_matches(self, prefix):
+        start = bisect_left(self._vocabulary, prefix)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def search(self, tokens):
+        """
+        Rank the products matching every query token.
+
+        Args:
+            tokens (list): Query tokens, each matched as a prefix.
+
+        Returns:
+            list: ``(product_id, score)`` pairs, best match first.
+        """
+        with self._lock:
+            total_docs = len(self._documents)
+            scores = None
+            for query_token in set(tokens):
+                token_scores = {}
+                for token in self._prefix_matches(query_token):
+                    postings = self._postings[token]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for product_id, weight in postings.items():
+                        token_scores[product_id] = token_scores.get(product_id, 0) + weight * idf
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {pid: score + token_scores[pid] for pid, score in scores.items() if pid in token_scores}
+                if not scores:
+                    return []
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+search_index = InvertedIndex()
+
+
+def use_fulltext():
+    """Return whether searches go to the MySQL FULLTEXT index rather than the in-process one."""
+    backend = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return db.session.get_bind(mapper=Product.__mapper__).dialect.name == 'mysql'
+    return backend == 'fulltext'
+
+
+def _ensure_index_loaded():
+    if not search_index.loaded:
+        rows = db.session.query(Product.id, Product.name, Product.description).yield_per(1000)
+        search_index.load(rows)
+
+
+def fulltext_queries(tokens, page, per_page, sort=None, columns=None):
+    """
+    Build the count and page statements for a FULLTEXT search on MySQL.
+
+    The two are independent, so an async caller can run them concurrently.
+
+    Args:
+        tokens (list): Query tokens; every one is required and matched as a prefix.
+        page (int): The 1-based page number.
+        per_page (int): The number of results per page.
+        sort (str, optional): 'name' or 'price'; by default matches are ranked by relevance.
+        columns (list, optional): Columns for the page to select instead of whole products.
+
+    Returns:
+        tuple: The ``(count, page)`` statements.
+    """
+    # Every token is required and matched as a prefix, mirroring the old substring search
+    score = match(Product.name, Product.description, against=' '.join(f'+{token}*' for token in tokens)).in_boolean_mode()
+    count = select(func.count()).select_from(Product).where(score > 0)
+
+    if sort in SORT_COLUMNS:
+        order = (SORT_COLUMNS[sort].asc(), Product.id.asc())
+    else:
+        order = (score.desc(), Product.id.asc())
+    items = select(*(columns or [Product])).where(score > 0).order_by(*order).limit(per_page).offset((page - 1) * per_page)
+    return count, items
+
+
+def _load(stmt, columns):
+    # Whole products, or rows of the requested columns
+    return db.session.execute(stmt).all() if columns else db.session.scalars(stmt).all()
+
+
+def _fulltext_search(tokens, page, per_page, sort, columns):
+    count, items = fulltext_queries(tokens, page, per_page, sort, columns)
+    return Page(_load(items, columns), page, per_page, db.session.scalar(count))
+
+
+def sort_key_queries(matched_ids, sort):
+    """
+    Build the statements reading the sort column of matched products.
+
+    The IDs are split into chunks of ``SORT_KEY_CHUNK_SIZE`` so a common
+    term never binds the whole match list into one statement.
+
+    Args:
+        matched_ids (list): IDs of the matching products.
+        sort (str): 'name' or 'price'.
+
+    Returns:
+        list: ``SELECT id, <sort column>`` statements, one per chunk.
+    """
+    column = SORT_COLUMNS[sort]
+    return [
+        select(Product.id, column).where(Product.id.in_(matched_ids[start:start + SORT_KEY_CHUNK_SIZE]))
+        for start in range(0, len(matched_ids), SORT_KEY_CHUNK_SIZE)
+    ]
+
+
+def sorted_page_ids(rows, offset, per_page):
+    """
+    Order ``(id, sort value)`` rows by value then ID and return one page of IDs.
+
+    Args:
+        rows (iterable): The rows read by the ``sort_key_queries`` statements.
+        offset (int): The number of results before the page.
+        per_page (int): The number of results per page.
+
+    Returns:
+        list: The IDs on the page, in order.
+    """
+    ordered = sorted(rows, key=lambda row: (row[1], row[0]))
+    return [row[0] for row in ordered[offset:offset + per_page]]
+
+
+def _inverted_index_search(tokens, page, per_page, sort, columns):
+    _ensure_index_loaded()
+    ranked = search_index.search(tokens)
+    total = len(ranked)
+    offset = (page - 1) * per_page
+
+    if sort in SORT_COLUMNS:
+        # Order the matches by the sort column in Python, then load only the page
+        rows = [row for stmt in sort_key_queries([product_id for product_id, _ in ranked], sort) for row in db.session.execute(stmt)]
+        page_ids = sorted_page_ids(rows, offset, per_page)
+    else:
+        page_ids = [product_id for product_id, _ in ranked[offset:offset + per_page]]
+    products = {product.id: product for product in _load(select(*(columns or [Product])).where(Product.id.in_(page_ids)), columns)} if page_ids else {}
+    items = [products[product_id] for product_id in page_ids if product_id in products]
+    return Page(items, page, per_page, total)
+
+
+def search_products(query, page=1, per_page=SEARCH_PER_PAGE, sort=None, columns=None):
+    """
+    Search product names and descriptions.
+
+    MySQL databases are searched through the ``ix_products_fulltext`` FULLTEXT
+    index; other databases fall back to the in-process inverted index.
+
+    Args:
+        query (str): The user's search text.
+        page (int): The 1-based page number.
+        per_page (int): The number of results per page.
+        sort (str, optional): 'name' or 'price' to sort matches by that column;
+            by default matches are ranked by relevance.
+        columns (list, optional): Load only these columns, which must include
+            ``Product.id``; the page then holds rows instead of products.
+
+    Returns:
+        Page: The requested page of matching products.
+    """
+    page = min(max(page, 1), MAX_PAGE)
+    tokens = tokenize(query)
+    if not tokens:
+        return Page([], page, per_page, 0)
+    if use_fulltext():
+        return _fulltext_search(tokens, page, per_page, sort, columns)
+    return _inverted_index_search(tokens, page, per_page, sort, columns)
+
+
+@on_products_committed
+def _update_search_index(changes):
+    """Apply committed product changes to the in-process index, if it is loaded."""
+    if not search_index.loaded:
+        return
+    for change in changes.values():
+        if change.action == 'stock':
+            continue  # Stock is not searchable
+        if change.action == 'delete':
+            search_index.remove(change.product_id)
+        else:
+            search_index.update(change.product_id, change.name, change.description)
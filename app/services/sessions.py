@@ -0,0 +1,181 @@
+import os
+import secrets
+import tempfile
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from app.services.cache import make_cache
+
+
+SECRET_KEY_FILE = 'secret_key'
+
+
+def load_or_create_secret_key(instance_path):
+    """
+    Return the secret key kept in the instance folder, creating it once.
+
+    Every worker process on the host reads the same file, so sessions and
+    CSRF tokens stay valid whichever worker serves a request and across
+    restarts. Deployments spanning several hosts should set ``SECRET_KEY``
+    in the environment instead.
+
+    Args:
+        instance_path (str): The app's instance folder.
+
+    Returns:
+        str: The secret key.
+
+    Raises:
+        RuntimeError: If the key file exists but is empty.
+    """
+    os.makedirs(instance_path, exist_ok=True)
+    path = os.path.join(instance_path, SECRET_KEY_FILE)
+    # Write the key in full under a temporary name, then link it into place:
+    # the link fails if another worker got there first, and readers never see
+    # a partly written file
+    fd, temp_path = tempfile.mkstemp(dir=instance_path, prefix=f'.{SECRET_KEY_FILE}-')
+    try:
+        key = secrets.token_hex(32)
+        with os.fdopen(fd, 'w') as handle:
+            handle.write(key)
+        try:
+            os.link(temp_path, path)
+            return key
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(temp_path)
+    with open(path) as handle:
+        key = handle.read().strip()
+    if not key:
+        raise RuntimeError(f'{path} is empty; delete it or set SECRET_KEY')
+    return key
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """
+    Session whose data lives in the session store; the cookie only carries
+    its signed ID.
+
+    Attributes:
+        sid (str): The session ID.
+        new (bool): Whether the session was created on this request.
+        modified (bool): Whether the data changed and must be saved.
+    """
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps session data in a cache backend shared by all workers, so cookies
+    stay small and any process or node can serve any user.
+
+    Args:
+        store: A ``LocalCache`` or ``RedisCache`` holding serialized sessions.
+    """
+
+    serializer = session_json_serializer
+    salt = 'quickshop-session'
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def _key(self, sid):
+        return f'session:{sid}'
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(self._key(sid))
+                if data is not None:
+                    return ServerSideSession(self.serializer.loads(data), sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified:
+                self.store.delete(self._key(session.sid))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        lifetime = int(app.permanent_session_lifetime.total_seconds())
+        self.store.set(self._key(session.sid), self.serializer.dumps(dict(session)), ttl=lifetime)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def init_sessions(app):
+    """
+    Configure the secret key and session storage for the app.
+
+    ``SECRET_KEY`` comes from the configuration, falling back to a key
+    persisted in the instance folder. ``SESSION_BACKEND`` selects where
+    session data lives: 'cookie' (Flask's signed cookie, the default),
+    'memory' (this process only), 'redis' (shared through
+    ``SESSION_REDIS_URL``) or 'fakeredis'.
+
+    Args:
+        app (Flask): The application being configured.
+    """
+    if not app.config.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = load_or_create_secret_key(app.instance_path)
+
+    backend = app.config.get('SESSION_BACKEND', 'cookie')
+    if backend != 'cookie':
+        store = make_cache(
+            backend=backend,
+            url=app.config.get('SESSION_REDIS_URL'),
+            max_entries=app.config.get('SESSION_MAX_ENTRIES', 100000),
+            default_ttl=int(app.permanent_session_lifetime.total_seconds()),
+        )
+        app.session_interface = ServerSideSessionInterface(store)
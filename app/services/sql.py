@@ -0,0 +1,102 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import db
+
+
+DEFAULT_CONFLICT_RETRIES = 3  # Attempts at a transaction that keeps losing version checks
+
+_INSERTS = {
+    'mysql': mysql.insert,
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def dialect_name(model):
+    """Return the name of the database dialect the model's table lives in."""
+    return db.session.get_bind(mapper=model.__mapper__).dialect.name
+
+
+def upsert(model, index_elements, set_, select=None, columns=None, dialect=None):
+    """
+    Build a single-statement INSERT that updates the existing row instead
+    when it collides with a unique key.
+
+    MySQL gets ``INSERT ... ON DUPLICATE KEY UPDATE``; SQLite and PostgreSQL
+    get ``INSERT ... ON CONFLICT (...) DO UPDATE``. Values are supplied when
+    the statement is executed (one dict, or a list for executemany), or come
+    from ``select``.
+
+    Args:
+        model: The mapped class to insert into.
+        index_elements (list): Column names of the unique key that may collide.
+        set_ (callable): Called with the incoming row's columns (MySQL's
+            ``inserted``, otherwise ``excluded``) and returning a dict of
+            column names to the values to set on the existing row.
+        select (Select, optional): Source rows for ``INSERT ... SELECT``.
+        columns (list, optional): Target column names for ``select``.
+        dialect (str, optional): The dialect to build for; by default the
+            one the model's table lives in, which needs an app context.
+
+    Returns:
+        Insert: The dialect-specific upsert statement.
+
+    Raises:
+        NotImplementedError: If the database has no upsert support.
+    """
+    name = dialect or dialect_name(model)
+    if name not in _INSERTS:
+        raise NotImplementedError(f'Upserts are not supported on {name}')
+
+    stmt = _INSERTS[name](model.__table__)
+    if select is not None:
+        stmt = stmt.from_select(columns, select)
+    if name == 'mysql':
+        return stmt.on_duplicate_key_update(set_(stmt.inserted))
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded))
+
+
+class VersionConflictError(Exception):
+    """
+    Raised when a versioned row changed after the caller read it.
+
+    Attributes:
+        current_version (int): The row's version now, or None if it is gone.
+    """
+
+    def __init__(self, message='The row was changed by another request', current_version=None):
+        super().__init__(message)
+        self.current_version = current_version
+
+
+def commit_with_retry(work, attempts=DEFAULT_CONFLICT_RETRIES):
+    """
+    Run ``work`` and commit, re-running the whole transaction when an
+    optimistic version check fails.
+
+    ``work`` must read the rows it changes itself, so each attempt starts
+    from their latest versions. It can raise ``VersionConflictError`` to
+    give up without retrying.
+
+    Args:
+        work (callable): Called with no arguments; makes the changes.
+        attempts (int): How many times to try before giving up.
+
+    Returns:
+        The value ``work`` returned on the attempt that committed.
+
+    Raises:
+        VersionConflictError: If every attempt lost a version check.
+    """
+    for _ in range(attempts):
+        try:
+            result = work()
+            db.session.commit()
+            return result
+        except StaleDataError:
+            db.session.rollback()
+        except VersionConflictError:
+            db.session.rollback()
+            raise
+    raise VersionConflictError(f'Gave up after {attempts} conflicting attempts')
@@ -0,0 +1,6 @@
+from app.asgi import create_asgi_app
+
+# Create the ASGI app: async cart, search and order views, with the Flask app
+# mounted for everything else. Serve it with an ASGI server, e.g.
+#   uvicorn asgi:app --workers 4
+app = create_asgi_app()
@@ -0,0 +1,180 @@
+"""
+Seed a database with a realistic storefront for benchmarking.
+
+Creates a category tree, products, users, open carts and order history
+with bulk inserts, so 100k products and 10k users take seconds rather
+than going through the ORM one row at a time. Every user's password is
+``benchmark``.
+
+Usage:
+    python benchmarks/seed.py --database-url sqlite:///bench.db
+    python benchmarks/seed.py --database-url mysql+pymysql://root@localhost/quickshop_bench --products 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+PASSWORD = 'benchmark'
+CHUNK_SIZE = 5000
+
+ADJECTIVES = ['red', 'blue', 'green', 'steel', 'wooden', 'compact', 'deluxe', 'classic', 'portable', 'smart', 'organic', 'vintage']
+NOUNS = ['widget', 'lamp', 'chair', 'kettle', 'backpack', 'speaker', 'notebook', 'blender', 'jacket', 'drill', 'mug', 'clock']
+DEPARTMENTS = ['Home', 'Garden', 'Kitchen', 'Electronics', 'Outdoors', 'Office', 'Toys', 'Clothing', 'Tools', 'Books']
+
+
+def _insert_chunked(model, rows):
+    from app import db
+
+    table = model.__table__
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+
+def seed(products=100000, users=10000, orders_per_user=5, cart_fraction=0.3, seed_value=1):
+    """
+    Fill the current app's database with benchmark data.
+
+    Must run inside an application context on an empty schema.
+
+    Args:
+        products (int): Products to create.
+        users (int): Users to create.
+        orders_per_user (int): Average orders per user.
+        cart_fraction (float): Share of users with items in their cart.
+        seed_value (int): Random seed, so runs are reproducible.
+
+    Returns:
+        dict: The number of rows created per table.
+    """
+    from app import db
+    from app.models.category import Category
+    from app.models.order import Order
+    from app.models.orderproduct import OrderProduct
+    from app.models.product import Product
+    from app.models.shopping_cart import ShoppingCart
+    from app.models.user import User
+    from app.services.orders import rebuild_order_summaries
+
+    rng = random.Random(seed_value)
+
+    # Categories go through the ORM so their materialized paths are maintained
+    leaves = []
+    for department in DEPARTMENTS:
+        parent = Category(name=department)
+        db.session.add(parent)
+        for noun in NOUNS[:4]:
+            leaves.append(Category(name=f'{department} {noun}s', parent=parent))
+    db.session.add_all(leaves)
+    db.session.commit()
+    leaf_ids = [leaf.id for leaf in leaves]
+
+    _insert_chunked(Product, [
+        {
+            'name': f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} {index}',
+            'description': f'A {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} that is {rng.choice(ADJECTIVES)} and {rng.choice(ADJECTIVES)}.',
+            'price': rng.randint(199, 49999) / 100,
+            'stock': 1000000,  # Enough that checkout benchmarks never run out
+            'sku': f'BENCH-{index:07d}',
+            'category_id': rng.choice(leaf_ids),
+        }
+        for index in range(products)
+    ])
+
+    password = generate_password_hash(PASSWORD)  # One hash shared by every user
+    _insert_chunked(User, [
+        {'username': f'user{index}', 'email': f'user{index}@example.com', 'password': password}
+        for index in range(users)
+    ])
+    db.session.commit()
+
+    product_ids = db.session.execute(select(Product.id)).scalars().all()
+    user_ids = db.session.execute(select(User.id)).scalars().all()
+    prices = dict(db.session.execute(select(Product.id, Product.price)).all())
+
+    carts = []
+    for user_id in rng.sample(user_ids, int(len(user_ids) * cart_fraction)):
+        for product_id in rng.sample(product_ids, rng.randint(1, 5)):
+            carts.append({'user_id': user_id, 'product_id': product_id, 'quantity': rng.randint(1, 3)})
+    _insert_chunked(ShoppingCart, carts)
+
+    # Orders are inserted with explicit IDs so their lines can be built in the same pass
+    next_order_id = (db.session.execute(select(func.max(Order.id))).scalar() or 0) + 1
+    orders, lines = [], []
+    for user_id in user_ids:
+        for _ in range(rng.randint(0, orders_per_user * 2)):
+            order_lines = []
+            for product_id in rng.sample(product_ids, rng.randint(1, 4)):
+                quantity = rng.randint(1, 3)
+                order_lines.append({
+                    'order_id': next_order_id,
+                    'product_id': product_id,
+                    'quantity': quantity,
+                    'unit_price': prices[product_id],
+                    'line_total': prices[product_id] * quantity,
+                })
+            orders.append({
+                'id': next_order_id,
+                'user_id': user_id,
+                'total_price': sum(line['line_total'] for line in order_lines),
+                'item_count': sum(line['quantity'] for line in order_lines),
+                'status': 'paid',
+            })
+            lines.extend(order_lines)
+            next_order_id += 1
+    _insert_chunked(Order, orders)
+    _insert_chunked(OrderProduct, lines)
+    rebuild_order_summaries()
+    db.session.commit()
+
+    return {
+        'categories': len(DEPARTMENTS) + len(leaves),
+        'products': products,
+        'users': users,
+        'cart_items': len(carts),
+        'orders': len(orders),
+        'order_lines': len(lines),
+    }
+
+
+def is_seeded():
+    """Return whether the current app's database already holds products."""
+    from app import db
+    from app.models.product import Product
+
+    return db.session.execute(select(func.count(Product.id))).scalar() > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.join(ROOT, 'instance', 'bench.db'))
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--orders-per-user', type=int, default=5)
+    args = parser.parse_args()
+
+    from app import create_app, db
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': args.database_url,
+        'ADMIN_ENABLED': False,
+        'INSTRUMENTATION_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+        if is_seeded():
+            sys.exit('Database already holds products; seed an empty database')
+        started = time.perf_counter()
+        counts = seed(products=args.products, users=args.users, orders_per_user=args.orders_per_user)
+        print(f'Seeded {counts} in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
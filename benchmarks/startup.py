@@ -0,0 +1,83 @@
+"""
+Measure application cold-start time.
+
+Each run starts a fresh interpreter, imports the app package and calls
+``create_app()``, so module imports, extension setup and any startup
+database work are all counted. Results are printed as JSON.
+
+Usage:
+    python benchmarks/startup.py --runs 10
+    ADMIN_ENABLED=0 python benchmarks/startup.py --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints the in-process import and build times
+CHILD = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+built = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': built - imported}))
+"""
+
+
+def run_once():
+    """Start one interpreter and return its timings in seconds."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-c', CHILD],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - started
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings['total'] = wall
+    return timings
+
+
+def summarize(samples):
+    """Return min/median/max in milliseconds for each timing."""
+    summary = {}
+    for key in samples[0]:
+        values = sorted(sample[key] * 1000 for sample in samples)
+        summary[key] = {
+            'min_ms': round(values[0], 2),
+            'median_ms': round(statistics.median(values), 2),
+            'max_ms': round(values[-1], 2),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Number of cold starts to measure.')
+    parser.add_argument('--output', help='Also write the JSON results to this file.')
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    result = {
+        'benchmark': 'startup',
+        'runs': args.runs,
+        'admin_enabled': os.environ.get('ADMIN_ENABLED', '1'),
+        'auto_create_schema': os.environ.get('AUTO_CREATE_SCHEMA', '0'),
+        'timings': summarize(samples),
+    }
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
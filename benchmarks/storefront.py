@@ -0,0 +1,291 @@
+"""
+Measure latency, throughput and queries per request on the storefront hot paths.
+
+Seeds the database on first use (see ``seed.py``), then drives each
+scenario through the Flask test client: warm-up requests first, then
+timed ones. Reports p50/p95/p99 latency, requests per second and SQL
+statements per request as JSON, and can compare against a previous run.
+
+Usage:
+    python benchmarks/storefront.py --output before.json
+    python benchmarks/storefront.py --compare before.json --tolerance 0.2
+    python benchmarks/storefront.py --products 5000 --users 500 --iterations 50 home product_detail
+    python benchmarks/storefront.py --as-user  # Log in everywhere, bypassing the page cache
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, func, select  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+import seed as seeding  # noqa: E402
+
+
+class QueryCounter:
+    """Counts SQL statements executed by any engine."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+class Scenario:
+    """
+    One benchmarked request.
+
+    Args:
+        name (str): The label in the results.
+        request (callable): Called with the client and a random generator;
+            sends one request and returns the response.
+        login (bool): Whether the client must be logged in.
+        prepare (callable, optional): Called with the client and random
+            generator before each request, untimed.
+    """
+
+    def __init__(self, name, request, login=False, prepare=None):
+        self.name = name
+        self.request = request
+        self.login = login
+        self.prepare = prepare
+
+
+def build_scenarios(context):
+    """
+    Return the scenarios, drawing IDs from the seeded data.
+
+    Args:
+        context (dict): ``product_ids``, ``category_ids`` and ``deep_cursor`` from the database.
+
+    Returns:
+        list: The scenarios, in run order.
+    """
+    product_ids = context['product_ids']
+    category_ids = context['category_ids']
+
+    def add_random_item(client, rng):
+        client.post('/cart/add', json={'product_id': rng.choice(product_ids), 'quantity': 1})
+
+    return [
+        Scenario('home', lambda client, rng: client.get('/')),
+        Scenario('product_list', lambda client, rng: client.get('/products')),
+        Scenario('product_list.sort_price', lambda client, rng: client.get('/products?sort=price')),
+        Scenario('product_list.search', lambda client, rng: client.get(f'/products?search={rng.choice(seeding.NOUNS)}')),
+        Scenario('product_list.search_sorted', lambda client, rng: client.get(f'/products?search={rng.choice(seeding.ADJECTIVES)}+{rng.choice(seeding.NOUNS)}&sort=price')),
+        Scenario('product_list.deep_offset', lambda client, rng: client.get(f'/products?page={rng.randint(500, 5000)}')),
+        Scenario('product_list.deep_cursor', lambda client, rng: client.get(f'/products?page=5000&cursor={context["deep_cursor"]}')),
+        Scenario('products_by_category', lambda client, rng: client.get(f'/products/category/{rng.choice(category_ids)}')),
+        Scenario('product_detail', lambda client, rng: client.get(f'/product/{rng.choice(product_ids)}')),
+        Scenario('cart.add', lambda client, rng: client.post('/cart/add', json={'product_id': rng.choice(product_ids), 'quantity': 1}), login=True),
+        Scenario('cart.view', lambda client, rng: client.get('/cart'), login=True),
+        Scenario('cart.summary', lambda client, rng: client.get('/cart/summary'), login=True),
+        Scenario('orders', lambda client, rng: client.get('/orders'), login=True),
+        Scenario('checkout', lambda client, rng: client.post('/checkout', data={'shipping_address': '1 Benchmark Way'}), login=True, prepare=add_random_item),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at ``fraction`` of a sorted list, interpolating between neighbours."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def run_scenario(app, scenario, counter, iterations, warmup, rng, as_user=False):
+    """
+    Run one scenario and return its statistics.
+
+    Args:
+        app (Flask): The application under test.
+        scenario (Scenario): The scenario to run.
+        counter (QueryCounter): Counts statements per request.
+        iterations (int): Timed requests.
+        warmup (int): Untimed requests sent first, to fill caches.
+        rng (random.Random): Source of IDs and search terms.
+        as_user (bool): Log in even for anonymous pages, so the page cache is bypassed.
+
+    Returns:
+        dict: Latency percentiles, throughput, queries per request and errors.
+    """
+    client = app.test_client()
+    if scenario.login or as_user:
+        user = rng.randrange(app.config['BENCHMARK_USERS'])
+        response = client.post('/login', data={'email': f'user{user}@example.com', 'password': seeding.PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f'Login failed with status {response.status_code}')
+
+    latencies, queries, errors = [], [], 0
+    for index in range(warmup + iterations):
+        if scenario.prepare:
+            scenario.prepare(client, rng)
+        counter.count = 0
+        started = time.perf_counter()
+        response = scenario.request(client, rng)
+        elapsed = time.perf_counter() - started
+        if index < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(counter.count)
+        if response.status_code >= 400:
+            errors += 1
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(total / len(latencies) * 1000, 3),
+        'requests_per_second': round(len(latencies) / total, 1) if total else None,
+        'queries_per_request': round(statistics.mean(queries), 2),
+        'max_queries': max(queries),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print each scenario's change against a baseline run.
+
+    Args:
+        results (dict): This run's scenario results.
+        baseline (dict): A previous run's JSON output.
+        tolerance (float): Allowed fractional increase in p95 latency.
+
+    Returns:
+        list: Names of scenarios whose p95 or query count regressed.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        change = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] if previous['p95_ms'] else 0
+        queries = current['queries_per_request'] - previous['queries_per_request']
+        flag = ''
+        if change > tolerance or queries > 0:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f'{name:32} p95 {previous["p95_ms"]:9.2f} -> {current["p95_ms"]:9.2f} ms ({change:+.0%})  queries {queries:+.2f}{flag}', file=sys.stderr)
+    return regressions
+
+
+def git_revision():
+    """Return the current commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('scenarios', nargs='*', help='Only run these scenarios.')
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.join(ROOT, 'instance', 'bench.db'))
+    parser.add_argument('--products', type=int, default=100000, help='Products to seed into an empty database.')
+    parser.add_argument('--users', type=int, default=10000, help='Users to seed into an empty database.')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed requests per scenario.')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per scenario.')
+    parser.add_argument('--as-user', action='store_true', help='Log in for every scenario, bypassing the page cache.')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for data and request mix.')
+    parser.add_argument('--output', help='Also write the JSON results to this file.')
+    parser.add_argument('--compare', help='A previous JSON result to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 increase when comparing.')
+    args = parser.parse_args()
+
+    os.makedirs(os.path.join(ROOT, 'instance'), exist_ok=True)
+    from app import create_app, db
+    from app.models.category import Category
+    from app.models.product import Product
+    from app.services.catalog import encode_cursor
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': args.database_url,
+        'WTF_CSRF_ENABLED': False,
+        'ADMIN_ENABLED': False,
+        'INSTRUMENTATION_ENABLED': False,  # Measured separately; keep its overhead out of the numbers
+        'PASSWORD_HASH_WORKERS': 0,
+        'LOGIN_MAX_FAILURES_PER_IP': 10 ** 9,
+        'BENCHMARK_USERS': args.users,
+    })
+
+    with app.app_context():
+        db.create_all()
+        seeded = None
+        if not seeding.is_seeded():
+            started = time.perf_counter()
+            seeded = seeding.seed(products=args.products, users=args.users, seed_value=args.seed)
+            print(f'Seeded {seeded} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+        product_ids = db.session.execute(select(Product.id)).scalars().all()
+        category_ids = db.session.execute(select(Category.id)).scalars().all()
+        product_count = len(product_ids)
+        deep = db.session.execute(
+            select(Product.name, Product.id).order_by(Product.name, Product.id).offset(min(product_count - 1, 50000)).limit(1)
+        ).one()
+        context = {
+            'product_ids': product_ids,
+            'category_ids': category_ids,
+            'deep_cursor': encode_cursor(deep.name, deep.id),
+        }
+        dialect = db.engine.dialect.name
+        user_count = db.session.execute(select(func.count()).select_from(db.metadata.tables['users'])).scalar()
+    app.config['BENCHMARK_USERS'] = user_count
+
+    scenarios = build_scenarios(context)
+    unknown = set(args.scenarios) - {scenario.name for scenario in scenarios}
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    counter = QueryCounter()
+    rng = random.Random(args.seed)
+    results = {}
+    for scenario in scenarios:
+        if args.scenarios and scenario.name not in args.scenarios:
+            continue
+        result = results[scenario.name] = run_scenario(app, scenario, counter, args.iterations, args.warmup, rng, args.as_user)
+        print(f'{scenario.name:32} p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+              f'{result["queries_per_request"]:5.1f} queries  {result["errors"]} errors', file=sys.stderr)
+
+    report = {
+        'benchmark': 'storefront',
+        'revision': git_revision(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': sys.version.split()[0],
+        'database': dialect,
+        'data': {'products': product_count, 'users': user_count, 'seeded_now': seeded},
+        'iterations': args.iterations,
+        'warmup': args.warmup,
+        'as_user': args.as_user,
+        'scenarios': results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            sys.exit(f'Regressions in: {", ".join(regressions)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Store money columns as integer cents
+
+Revision ID: 0a6d2f8e4c71
+Revises: f19b6d0c3e58
+Create Date: 2024-12-09 15:40:18.052736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6d2f8e4c71'
+down_revision = 'f19b6d0c3e58'
+branch_labels = None
+depends_on = None
+
+
+MONEY_COLUMNS = [
+    ('products', 'price'),
+    ('orders', 'total_price'),
+    ('order_products', 'unit_price'),
+    ('order_products', 'line_total'),
+    ('user_order_summaries', 'total_spent'),
+]
+
+
+def upgrade():
+    for table, column in MONEY_COLUMNS:
+        # Scale while the column is still a float, then narrow it to whole cents
+        op.execute(f'UPDATE {table} SET {column} = ROUND({column} * 100)')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.Float(), type_=sa.BigInteger(), existing_nullable=False)
+
+
+def downgrade():
+    for table, column in MONEY_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.BigInteger(), type_=sa.Float(), existing_nullable=False)
+        op.execute(f'UPDATE {table} SET {column} = {column} / 100.0')
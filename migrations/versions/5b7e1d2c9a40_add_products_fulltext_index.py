@@ -0,0 +1,29 @@
+"""Add FULLTEXT index on product name and description for search
+
+Revision ID: 5b7e1d2c9a40
+Revises: 4b1d7e9c2a60
+Create Date: 2024-11-12 10:15:02.418377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e1d2c9a40'
+down_revision = '4b1d7e9c2a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FULLTEXT indexes only exist on MySQL; other databases use the in-process search index
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.create_index('ix_products_fulltext', 'products', ['name', 'description'], unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.drop_index('ix_products_fulltext', table_name='products')
@@ -0,0 +1,53 @@
+"""Merge duplicate cart rows and add a unique key on (user_id, product_id)
+
+Revision ID: a41f9e03c7b2
+Revises: 8c3d4f6a1e27
+Create Date: 2024-11-18 14:31:09.552210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f9e03c7b2'
+down_revision = '8c3d4f6a1e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fold duplicate rows into the oldest one before the unique key can be added
+    if op.get_bind().dialect.name == 'mysql':
+        op.execute("""
+            UPDATE shopping_carts sc
+            JOIN (SELECT MIN(id) AS keep_id, SUM(quantity) AS total
+                  FROM shopping_carts GROUP BY user_id, product_id HAVING COUNT(*) > 1) dupes
+              ON sc.id = dupes.keep_id
+            SET sc.quantity = dupes.total
+        """)
+        op.execute("""
+            DELETE sc FROM shopping_carts sc
+            JOIN (SELECT user_id, product_id, MIN(id) AS keep_id
+                  FROM shopping_carts GROUP BY user_id, product_id HAVING COUNT(*) > 1) dupes
+              ON sc.user_id = dupes.user_id AND sc.product_id = dupes.product_id AND sc.id <> dupes.keep_id
+        """)
+    else:
+        op.execute("""
+            UPDATE shopping_carts SET quantity = (
+                SELECT SUM(other.quantity) FROM shopping_carts other
+                WHERE other.user_id = shopping_carts.user_id AND other.product_id = shopping_carts.product_id)
+            WHERE id IN (SELECT MIN(id) FROM shopping_carts GROUP BY user_id, product_id HAVING COUNT(*) > 1)
+        """)
+        op.execute("""
+            DELETE FROM shopping_carts
+            WHERE id NOT IN (SELECT MIN(id) FROM shopping_carts GROUP BY user_id, product_id)
+        """)
+
+    with op.batch_alter_table('shopping_carts', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_shopping_carts_user_product', ['user_id', 'product_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('shopping_carts', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_shopping_carts_user_product', type_='unique')
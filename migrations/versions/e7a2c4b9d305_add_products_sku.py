@@ -0,0 +1,28 @@
+"""Add a unique SKU to products for catalog imports
+
+Revision ID: e7a2c4b9d305
+Revises: d5e8a31f6b94
+Create Date: 2024-12-02 09:27:41.318502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c4b9d305'
+down_revision = 'd5e8a31f6b94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sku', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_products_sku', ['sku'])
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_products_sku', type_='unique')
+        batch_op.drop_column('sku')
@@ -0,0 +1,69 @@
+"""Snapshot order line prices and add per-user order summaries
+
+Revision ID: f19b6d0c3e58
+Revises: e7a2c4b9d305
+Create Date: 2024-12-05 10:12:56.731904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f19b6d0c3e58'
+down_revision = 'e7a2c4b9d305'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('order_products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unit_price', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('line_total', sa.Float(), nullable=True))
+
+    # Existing lines never recorded what was paid; the current price is the best available guess
+    op.execute("""
+        UPDATE order_products
+        SET unit_price = COALESCE((SELECT price FROM products WHERE products.id = order_products.product_id), 0)
+    """)
+    op.execute("UPDATE order_products SET line_total = unit_price * quantity")
+    op.execute("""
+        UPDATE orders
+        SET item_count = COALESCE((SELECT SUM(quantity) FROM order_products WHERE order_products.order_id = orders.id), 0)
+    """)
+
+    with op.batch_alter_table('order_products', schema=None) as batch_op:
+        batch_op.alter_column('unit_price', existing_type=sa.Float(), nullable=False)
+        batch_op.alter_column('line_total', existing_type=sa.Float(), nullable=False)
+
+    op.create_table('user_order_summaries',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('total_spent', sa.Float(), nullable=False),
+    sa.Column('last_order_id', sa.Integer(), nullable=True),
+    sa.Column('last_order_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute("""
+        INSERT INTO user_order_summaries (user_id, order_count, item_count, total_spent, last_order_id, last_order_at)
+        SELECT user_id, COUNT(id), SUM(item_count), SUM(total_price), MAX(id), MAX(created_at)
+        FROM orders GROUP BY user_id
+    """)
+
+
+def downgrade():
+    op.drop_table('user_order_summaries')
+
+    with op.batch_alter_table('order_products', schema=None) as batch_op:
+        batch_op.drop_column('line_total')
+        batch_op.drop_column('unit_price')
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_column('created_at')
+        batch_op.drop_column('item_count')